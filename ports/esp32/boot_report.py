@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Prints per-stage boot time statistics of a badge.
+
+The badge keeps its last boot profiles in RTC memory (see modules/system/profiler.py). This script either reads them
+through the raw REPL of a connected badge or parses the output of `system.profiler.dump()` saved to a file.
+
+    python3 boot_report.py /dev/ttyUSB0
+    python3 boot_report.py -f dump.txt
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+
+def read_device(device, baudrate):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tools'))
+    import pyboard
+    board = pyboard.Pyboard(device, baudrate)
+    board.enter_raw_repl()
+    try:
+        return board.exec_('import system.profiler; system.profiler.dump()').decode('utf8')
+    finally:
+        board.exit_raw_repl()
+        board.close()
+
+
+def parse(output):
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith('{'):
+            return json.loads(line)
+    raise ValueError('No boot profile dump found')
+
+
+def report(dump):
+    stages = dump['stages']
+    profiles = dump['profiles']
+    print('%d boot(s) recorded' % len(profiles))
+    print('%-20s %10s %10s %10s %10s' % ('stage', 'median', 'min', 'max', 'boots'))
+    for i, stage in enumerate(stages):
+        # Skipped stages are recorded as 0
+        values = [profile[i] / 1000 for profile in profiles if profile[i]]
+        if not values:
+            continue
+        print('%-20s %10.1f %10.1f %10.1f %10d' % (
+            stage, statistics.median(values), min(values), max(values), len(values),
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report badge boot stage timings (ms).')
+    parser.add_argument('device', nargs='?', default='/dev/ttyUSB0', help='serial device of the badge')
+    parser.add_argument('-b', '--baudrate', type=int, default=115200, help='baudrate of the serial device')
+    parser.add_argument('-f', '--file', help='read a saved dump() output instead of querying the badge')
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file) as f:
+            output = f.read()
+    else:
+        output = read_device(args.device, args.baudrate)
+    report(parse(output))
+
+
+if __name__ == '__main__':
+    main()
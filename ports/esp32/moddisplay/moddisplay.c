@@ -44,9 +44,7 @@
 #include "moddisplay.h"
 #include "moddisplay_display.c"
 #include "moddisplay_frame.c"
-#ifndef UNIX
-    #include "moddisplay_epd2in9.c"
-#endif
+#include "moddisplay_epd2in9.c"
 
 STATIC mp_obj_t display_font_size(mp_obj_t id_in) {
     display_font_t *font = display_frame_get_font(mp_obj_get_int(id_in));
@@ -78,6 +76,8 @@ STATIC const mp_rom_map_elem_t display_globals_table[] = {
   { MP_ROM_QSTR(MP_QSTR_NO_WRAP), MP_ROM_INT(NO_WRAP) },
   { MP_ROM_QSTR(MP_QSTR_WRAP_INDENT), MP_ROM_INT(WRAP_INDENT) },
   { MP_ROM_QSTR(MP_QSTR_WRAP_LINE_START), MP_ROM_INT(WRAP_LINE_START) },
+  { MP_ROM_QSTR(MP_QSTR_MODE_PARTIAL), MP_ROM_INT(MODE_PARTIAL) },
+  { MP_ROM_QSTR(MP_QSTR_MODE_FULL), MP_ROM_INT(MODE_FULL) },
 };
 
 STATIC MP_DEFINE_CONST_DICT (
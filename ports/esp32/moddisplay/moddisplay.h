@@ -57,4 +57,8 @@
 #define WRAP_INDENT         1
 #define WRAP_LINE_START     2
 
+// Refresh waveforms
+#define MODE_PARTIAL        0
+#define MODE_FULL           1
+
 #endif // MICROPY_INCLUDED_EXTMOD_DISPLAY_H
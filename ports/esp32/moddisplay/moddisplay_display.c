@@ -40,9 +40,7 @@
 #include "moddisplay.h"
 #include "moddisplay_display.h"
 #include "moddisplay_frame.h"
-#ifndef UNIX
-    #include "moddisplay_epd2in9.h"
-#endif
+#include "moddisplay_epd2in9.h"
 
 /*
 Get or set the rotation of the display
@@ -110,6 +108,13 @@ MP_DEFINE_CONST_FUN_OBJ_VAR_BETWEEN(
     display_display_call_font
 );
 
+STATIC void display_display_set_box(int *box, int x0, int y0, int x1, int y1) {
+    box[0] = x0;
+    box[1] = y0;
+    box[2] = x1;
+    box[3] = y1;
+}
+
 /*
 Initialize the display
 */
@@ -117,6 +122,7 @@ STATIC mp_obj_t display_display_init(mp_obj_t self_in) {
     #ifndef UNIX
         display_display_obj_t *self = MP_OBJ_TO_PTR(self_in);
         display_epd2in9_init(self);
+        display_display_set_box(self->stale, 0, 0, self->frame->width - 1, self->frame->height - 1);
     #endif
     return mp_const_none;
 }
@@ -136,6 +142,9 @@ STATIC mp_obj_t display_display_clear(mp_obj_t self_in, mp_obj_t color_in) {
         display_frame_clear(self->frame, color ? 1 : 0);
         display_epd2in9_set_frame_memory(self);
         display_epd2in9_flush(self);
+        // the bank written next still holds the inverted frame
+        display_frame_mark_clean(self->frame);
+        display_display_set_box(self->stale, 0, 0, self->frame->width - 1, self->frame->height - 1);
     #else
         display_frame_clear(self->frame, color ? 1 : 0);
     #endif
@@ -157,14 +166,82 @@ MP_DEFINE_CONST_FUN_OBJ_2(display_display_fill_obj,
                           display_display_fill);
 
 /*
-Update the display
+Update the display with the pixels drawn since the last update,
+only the window x, y, width, height or with full=True the whole frame.
+With wait=False it returns as soon as the frame is in the panel's RAM,
+the frame buffer can be drawn to while the panel refreshes.
+mode=MODE_PARTIAL or MODE_FULL switches the waveform for this and the following updates.
+Returns the number of bytes sent to the panel.
 */
-STATIC mp_obj_t display_display_update(mp_obj_t self_in) {
-    display_display_obj_t *self = MP_OBJ_TO_PTR(self_in);
-    #ifndef UNIX
+STATIC mp_obj_t display_display_update(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args) {
+    enum { ARG_x, ARG_y, ARG_width, ARG_height, ARG_full, ARG_wait, ARG_mode };
+    static const mp_arg_t allowed_args[] = {
+      { MP_QSTR_x,          MP_ARG_OBJ, {.u_obj = mp_const_none} },
+      { MP_QSTR_y,          MP_ARG_INT, {.u_int = 0} },
+      { MP_QSTR_width,      MP_ARG_INT, {.u_int = 0} },
+      { MP_QSTR_height,     MP_ARG_INT, {.u_int = 0} },
+      { MP_QSTR_full,       MP_ARG_KW_ONLY | MP_ARG_BOOL, {.u_bool = 0} },
+      { MP_QSTR_wait,       MP_ARG_KW_ONLY | MP_ARG_BOOL, {.u_bool = 1} },
+      { MP_QSTR_mode,       MP_ARG_KW_ONLY | MP_ARG_OBJ, {.u_obj = mp_const_none} },
+    };
+    display_display_obj_t *self = MP_OBJ_TO_PTR(pos_args[0]);
+    display_frame_t *frame = self->frame;
+    mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
+    mp_arg_parse_all(n_args - 1, pos_args + 1, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
+    self->transfer_bytes = 0;
+    self->transfer_count = 0;
+    self->transfer_time = 0;
+
+    // window to send and the part of it the other RAM bank will be missing afterwards
+    int window[4], stale[4], rect[4];
+    if (args[ARG_full].u_bool) {
+        display_display_set_box(window, 0, 0, frame->width - 1, frame->height - 1);
+        display_display_set_box(stale, 0, 0, frame->width - 1, frame->height - 1);
+        display_frame_mark_clean(frame);
+    } else if (args[ARG_x].u_obj != mp_const_none) {
+        if (!display_frame_absolute_rect(frame, mp_obj_get_int(args[ARG_x].u_obj), args[ARG_y].u_int,
+                                         args[ARG_width].u_int, args[ARG_height].u_int, rect)) {
+            return MP_OBJ_NEW_SMALL_INT(0);
+        }
+        display_display_set_box(window, rect[0] & ~7, rect[1], (rect[0] + rect[2] - 1) | 7, rect[1] + rect[3] - 1);
+        display_display_set_box(stale, window[0], window[1], window[2], window[3]);
+        if (frame->dirty[0] >= window[0] && frame->dirty[1] >= window[1] && frame->dirty[2] <= window[2] && frame->dirty[3] <= window[3]) {
+            display_frame_mark_clean(frame);
+        }
+    } else {
+        if (frame->dirty[2] < frame->dirty[0]) {
+            return MP_OBJ_NEW_SMALL_INT(0);
+        }
+        display_display_set_box(window, frame->dirty[0], frame->dirty[1], frame->dirty[2], frame->dirty[3]);
+        display_display_set_box(stale, window[0], window[1], window[2], window[3]);
+        display_frame_mark_clean(frame);
+    }
+    // this bank also lacks what the previous update wrote to the other one
+    if (self->stale[2] >= self->stale[0]) {
+        display_display_set_box(window,
+            MIN(window[0], self->stale[0]), MIN(window[1], self->stale[1]),
+            MAX(window[2], self->stale[2]), MAX(window[3], self->stale[3]));
+    }
+    int bytes = (window[2] - window[0] + 1) / 8 * (window[3] - window[1] + 1);
+    display_display_set_box(self->stale, stale[0], stale[1], stale[2], stale[3]);
+    // the unix build runs the same transfers without a panel to count them
+    // the RAM can't be written while the previous refresh is still running
+    display_epd2in9_wait_until_idle(self);
+    if (args[ARG_mode].u_obj != mp_const_none && mp_obj_get_int(args[ARG_mode].u_obj) != self->lut) {
+        display_epd2in9_load_lut(self, mp_obj_get_int(args[ARG_mode].u_obj));
+    }
+    if (bytes == frame->size) {
         display_epd2in9_set_frame_memory(self);
+    } else {
+        display_epd2in9_set_frame_memory_partial(self, window[0], window[1], window[2] - window[0] + 1, window[3] - window[1] + 1);
+    }
+    if (args[ARG_wait].u_bool) {
         display_epd2in9_flush(self);
-    #else
+    } else {
+        display_epd2in9_activate(self);
+    }
+    #ifdef UNIX
+    if (self->dump) {
         int width = (self->frame->rotation == ROTATE_0 || self->frame->rotation == ROTATE_180) ? self->frame->width : self->frame->height;
         int height = (self->frame->rotation == ROTATE_0 || self->frame->rotation == ROTATE_180) ? self->frame->height : self->frame->width;
         printf("---INIT DISPLAY UPDATE---\n");
@@ -186,11 +263,58 @@ STATIC mp_obj_t display_display_update(mp_obj_t self_in) {
         //     printf("\n");
         // }
         printf("---DONE DISPLAY UPDATE---\n");
+    }
     #endif
-    return mp_const_none;
+    return mp_obj_new_int(bytes);
 }
-MP_DEFINE_CONST_FUN_OBJ_1(display_display_update_obj,
-                          display_display_update);
+MP_DEFINE_CONST_FUN_OBJ_KW(display_display_update_obj, 1, display_display_update);
+
+/*
+Get the area x, y, width, height drawn since the last update, None if nothing was drawn
+*/
+STATIC mp_obj_t display_display_dirty(mp_obj_t self_in) {
+    display_display_obj_t *self = MP_OBJ_TO_PTR(self_in);
+    int *dirty = self->frame->dirty;
+    int rect[4];
+    if (dirty[2] < dirty[0]) {
+        return mp_const_none;
+    }
+    display_frame_relative_rect(self->frame, dirty[0], dirty[1], dirty[2], dirty[3], rect);
+    mp_obj_t area[] = {
+        mp_obj_new_int(rect[0]),
+        mp_obj_new_int(rect[1]),
+        mp_obj_new_int(rect[2]),
+        mp_obj_new_int(rect[3])
+    };
+    return mp_obj_new_tuple(4, area);
+}
+MP_DEFINE_CONST_FUN_OBJ_1(display_display_dirty_obj,
+                          display_display_dirty);
+
+/*
+Check if the panel is still refreshing
+*/
+STATIC mp_obj_t display_display_busy(mp_obj_t self_in) {
+    display_display_obj_t *self = MP_OBJ_TO_PTR(self_in);
+    return mp_obj_new_bool(display_epd2in9_is_busy(self));
+}
+MP_DEFINE_CONST_FUN_OBJ_1(display_display_busy_obj,
+                          display_display_busy);
+
+/*
+Get the SPI bytes, transactions and microseconds of the last update
+*/
+STATIC mp_obj_t display_display_transfers(mp_obj_t self_in) {
+    display_display_obj_t *self = MP_OBJ_TO_PTR(self_in);
+    mp_obj_t transfers[] = {
+        mp_obj_new_int(self->transfer_bytes),
+        mp_obj_new_int(self->transfer_count),
+        mp_obj_new_int(self->transfer_time)
+    };
+    return mp_obj_new_tuple(3, transfers);
+}
+MP_DEFINE_CONST_FUN_OBJ_1(display_display_transfers_obj,
+                          display_display_transfers);
 
 /*
 Set a single pixel
@@ -573,6 +697,9 @@ STATIC const mp_rom_map_elem_t display_display_locals_dict_table[] = {
     { MP_ROM_QSTR(MP_QSTR_clear), MP_ROM_PTR(&display_display_clear_obj) },
     { MP_ROM_QSTR(MP_QSTR_fill), MP_ROM_PTR(&display_display_fill_obj) },
     { MP_ROM_QSTR(MP_QSTR_update), MP_ROM_PTR(&display_display_update_obj) },
+    { MP_ROM_QSTR(MP_QSTR_transfers), MP_ROM_PTR(&display_display_transfers_obj) },
+    { MP_ROM_QSTR(MP_QSTR_busy), MP_ROM_PTR(&display_display_busy_obj) },
+    { MP_ROM_QSTR(MP_QSTR_dirty), MP_ROM_PTR(&display_display_dirty_obj) },
     { MP_ROM_QSTR(MP_QSTR_pixel), MP_ROM_PTR(&display_display_pixel_obj) },
     { MP_ROM_QSTR(MP_QSTR_text), MP_ROM_PTR(&display_display_text_obj) },
     { MP_ROM_QSTR(MP_QSTR_line), MP_ROM_PTR(&display_display_line_obj) },
@@ -596,7 +723,7 @@ STATIC mp_obj_t display_display_make_new( const mp_obj_type_t *type,
                                   const mp_obj_t *all_args ) {
     enum { ARG_buffer, ARG_spi, ARG_width, ARG_height,
         ARG_rst, ARG_dc, ARG_cs, ARG_busy,
-        ARG_rotation, ARG_invert, ARG_font, ARG_partial };
+        ARG_rotation, ARG_invert, ARG_font, ARG_partial, ARG_dump };
     static const mp_arg_t allowed_args[] = {
       { MP_QSTR_buffer,     MP_ARG_OBJ | MP_ARG_REQUIRED },
       { MP_QSTR_spi,        MP_ARG_OBJ | MP_ARG_REQUIRED },
@@ -610,6 +737,8 @@ STATIC mp_obj_t display_display_make_new( const mp_obj_type_t *type,
       { MP_QSTR_invert,     MP_ARG_KW_ONLY | MP_ARG_BOOL, {.u_bool = 0} },
       { MP_QSTR_font,       MP_ARG_KW_ONLY | MP_ARG_INT, {.u_int = FONT_NULL} },
       { MP_QSTR_partial,    MP_ARG_KW_ONLY | MP_ARG_BOOL, {.u_bool = 1} },
+      // unix only, print every update for ports/unix/run.py
+      { MP_QSTR_dump,       MP_ARG_KW_ONLY | MP_ARG_BOOL, {.u_bool = 1} },
     };
 
     mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
@@ -638,6 +767,8 @@ STATIC mp_obj_t display_display_make_new( const mp_obj_type_t *type,
         self->dc = args[ARG_dc].u_obj == MP_OBJ_NULL ? -1 : machine_pin_get_id(args[ARG_dc].u_obj);
         self->cs = args[ARG_cs].u_obj == MP_OBJ_NULL ? -1 : machine_pin_get_id(args[ARG_cs].u_obj);
         self->busy = args[ARG_busy].u_obj == MP_OBJ_NULL ? -1 : machine_pin_get_id(args[ARG_busy].u_obj);
+    #else
+        self->dump = args[ARG_dump].u_bool;
     #endif
 
     // set the member number with the first argument of the constructor
@@ -649,9 +780,15 @@ STATIC mp_obj_t display_display_make_new( const mp_obj_type_t *type,
     // self->frame_obj = frame;
     self->frame = &self->frame_obj; // prevent GC from deleting it!
     display_frame_init(self->frame, width, height, args[ARG_buffer].u_obj);
+    // nothing is known about the content of the panel's RAM yet
+    display_display_set_box(self->stale, 0, 0, self->frame->width - 1, self->frame->height - 1);
+    self->transfer_bytes = 0;
+    self->transfer_count = 0;
+    self->transfer_time = 0;
 
     // kw args
     self->partial = args[ARG_partial].u_bool;
+    self->lut = self->partial ? MODE_PARTIAL : MODE_FULL;
     self->frame->rotation = args[ARG_rotation].u_int;
     self->frame->inverted = args[ARG_invert].u_bool;
 
@@ -43,11 +43,20 @@ typedef struct _display_display_obj_t {
     mp_obj_t *spi;
     #ifndef UNIX
         gpio_num_t rst, dc, cs, busy;
+    #else
+        // print the frame on every update
+        bool dump;
     #endif
     // a member created by us
     unsigned char font, partial;
+    // MODE_PARTIAL or MODE_FULL, the waveform loaded into the controller
+    unsigned char lut;
     display_frame_t frame_obj;
     display_frame_t *frame;
+    // the controller alternates between two RAM banks, this box x0, y0, x1, y1 is missing in the next one
+    int stale[4];
+    // SPI bytes, transactions and microseconds spent sending since the last update began
+    unsigned int transfer_bytes, transfer_count, transfer_time;
 } display_display_obj_t;
 
 
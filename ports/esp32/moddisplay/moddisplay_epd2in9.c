@@ -30,13 +30,25 @@
  * POSSIBILITY OF SUCH DAMAGE.
  */
 
-#include "extmod/machine_spi.h"
-#include "modmachine.h"
+#ifndef UNIX
+    #include "extmod/machine_spi.h"
+    #include "modmachine.h"
+#else
+    // There is no panel attached, transfers are only counted
+    #define gpio_set_level(pin, level)
+    #define gpio_get_level(pin) LOW
+#endif
 
 #include "moddisplay_epd2in9.h"
 
 void spi_write(display_display_obj_t *self, size_t len, const uint8_t* buf) {
-    mp_machine_spi_transfer(self->spi, len, buf, NULL);
+    mp_uint_t start = mp_hal_ticks_us();
+    #ifndef UNIX
+        mp_machine_spi_transfer(self->spi, len, buf, NULL);
+    #endif
+    self->transfer_bytes += len;
+    self->transfer_count++;
+    self->transfer_time += mp_hal_ticks_us() - start;
 }
 
 int display_epd2in9_init(display_display_obj_t *self) {
@@ -57,12 +69,18 @@ int display_epd2in9_init(display_display_obj_t *self) {
     display_epd2in9_send_data(self, 0x08);                     // 2us per line
     display_epd2in9_send_command(self, DATA_ENTRY_MODE_SETTING);
     display_epd2in9_send_data(self, 0x03);
-    if (self->partial) {
-        display_epd2in9_send_lut(self, display_epd2in9_lut_partial);
-    } else {
+    display_epd2in9_load_lut(self, self->partial ? MODE_PARTIAL : MODE_FULL);
+    return 0;
+}
+
+void display_epd2in9_load_lut(display_display_obj_t *self, int mode) {
+    if (mode == MODE_FULL) {
         display_epd2in9_send_lut(self, display_epd2in9_lut_full);
+        self->lut = MODE_FULL;
+    } else {
+        display_epd2in9_send_lut(self, display_epd2in9_lut_partial);
+        self->lut = MODE_PARTIAL;
     }
-    return 0;
 }
 
 void display_epd2in9_reset(display_display_obj_t *self) {
@@ -73,19 +91,20 @@ void display_epd2in9_reset(display_display_obj_t *self) {
 }
 
 void display_epd2in9_send_lut(display_display_obj_t *self, const unsigned char* lut) {
-    display_epd2in9_send_command(self, WRITE_LUT_REGISTER);
     /* the length of look-up table is 30 bytes */
-    for (int i = 0; i < 30; i++) {
-        display_epd2in9_send_data(self, lut[i]);
-    }
+    display_epd2in9_send(self, WRITE_LUT_REGISTER, 30, lut);
 }
 
 void display_epd2in9_flush(display_display_obj_t *self) {
+    display_epd2in9_activate(self);
+    display_epd2in9_wait_until_idle(self);
+}
+
+void display_epd2in9_activate(display_display_obj_t *self) {
     display_epd2in9_send_command(self, DISPLAY_UPDATE_CONTROL_2);
     display_epd2in9_send_data(self, 0xC4);
     display_epd2in9_send_command(self, MASTER_ACTIVATION);
     display_epd2in9_send_command(self, TERMINATE_FRAME_READ_WRITE);
-    display_epd2in9_wait_until_idle(self);
 }
 
 void display_epd2in9_send_command(display_display_obj_t *self, const uint8_t command) {
@@ -109,6 +128,11 @@ void display_epd2in9_send_data_buffer(display_display_obj_t *self, size_t len, c
     gpio_set_level(self->cs, HIGH);
 }
 
+void display_epd2in9_send(display_display_obj_t *self, const uint8_t command, size_t len, const uint8_t* buf) {
+    display_epd2in9_send_command(self, command);
+    display_epd2in9_send_data_buffer(self, len, buf);
+}
+
 void display_epd2in9_wait_until_idle(display_display_obj_t *self) {
     // LOW: idle, HIGH: busy
     while(gpio_get_level(self->busy) == HIGH) {
@@ -116,41 +140,39 @@ void display_epd2in9_wait_until_idle(display_display_obj_t *self) {
     }
 }
 
+int display_epd2in9_is_busy(display_display_obj_t *self) {
+    return gpio_get_level(self->busy) == HIGH;
+}
+
 void display_epd2in9_set_memory_area(display_display_obj_t *self, int x_start, int y_start, int x_end, int y_end) {
-    display_epd2in9_send_command(self, SET_RAM_X_ADDRESS_START_END_POSITION);
     /* x point must be the multiple of 8 or the last 3 bits will be ignored */
-    display_epd2in9_send_data(self, (x_start >> 3) & 0xFF);
-    display_epd2in9_send_data(self, (x_end >> 3) & 0xFF);
-    display_epd2in9_send_command(self, SET_RAM_Y_ADDRESS_START_END_POSITION);
-    display_epd2in9_send_data(self, y_start & 0xFF);
-    display_epd2in9_send_data(self, (y_start >> 8) & 0xFF);
-    display_epd2in9_send_data(self, y_end & 0xFF);
-    display_epd2in9_send_data(self, (y_end >> 8) & 0xFF);
+    uint8_t x[] = {(x_start >> 3) & 0xFF, (x_end >> 3) & 0xFF};
+    uint8_t y[] = {y_start & 0xFF, (y_start >> 8) & 0xFF, y_end & 0xFF, (y_end >> 8) & 0xFF};
+    display_epd2in9_send(self, SET_RAM_X_ADDRESS_START_END_POSITION, sizeof(x), x);
+    display_epd2in9_send(self, SET_RAM_Y_ADDRESS_START_END_POSITION, sizeof(y), y);
 }
 
 void display_epd2in9_set_memory_pointer(display_display_obj_t *self, int x, int y) {
-    display_epd2in9_send_command(self, SET_RAM_X_ADDRESS_COUNTER);
     /* x point must be the multiple of 8 or the last 3 bits will be ignored */
-    display_epd2in9_send_data(self, (x >> 3) & 0xFF);
-    display_epd2in9_send_command(self, SET_RAM_Y_ADDRESS_COUNTER);
-    display_epd2in9_send_data(self, y & 0xFF);
-    display_epd2in9_send_data(self, (y >> 8) & 0xFF);
+    uint8_t x_counter[] = {(x >> 3) & 0xFF};
+    uint8_t y_counter[] = {y & 0xFF, (y >> 8) & 0xFF};
+    display_epd2in9_send(self, SET_RAM_X_ADDRESS_COUNTER, sizeof(x_counter), x_counter);
+    display_epd2in9_send(self, SET_RAM_Y_ADDRESS_COUNTER, sizeof(y_counter), y_counter);
     display_epd2in9_wait_until_idle(self);
 }
 
 void display_epd2in9_set_frame_memory_partial(display_display_obj_t *self, int x, int y, int width, int height) {
-    int x_end, y_end;
+    int x_end, y_end, stride;
 
-    if (x < 0 || width < 0 || y < 0 || height < 0) {
+    if (x < 0 || width <= 0 || y < 0 || height <= 0) {
         return;
     }
     /* x point must be the multiple of 8 or the last 3 bits will be ignored */
-    x &= 0xF8;
-    width &= 0xF8;
+    x &= ~7;
     if (x + width >= self->frame->width) {
         x_end = self->frame->width - 1;
     } else {
-        x_end = x + width - 1;
+        x_end = (x + width - 1) | 7;
     }
     if (y + height >= self->frame->height) {
         y_end = self->frame->height - 1;
@@ -161,11 +183,19 @@ void display_epd2in9_set_frame_memory_partial(display_display_obj_t *self, int x
     display_epd2in9_set_memory_pointer(self, x, y);
     display_epd2in9_send_command(self, WRITE_RAM);
     /* send the image data */
-    for (int j = 0; j < y_end - y + 1; j++) {
-        for (int i = 0; i < (x_end - x + 1) / 8; i++) {
-            display_epd2in9_send_data(self, self->frame->buf[i + j * (width / 8)]);
-        }
+    stride = self->frame->width / 8;
+    if (x == 0 && x_end == self->frame->width - 1) {
+        // whole rows are contiguous in the frame buffer
+        display_epd2in9_send_data_buffer(self, (y_end - y + 1) * stride, &self->frame->buf[y * stride]);
+        return;
     }
+    // one burst per row of the window while CS stays low
+    gpio_set_level(self->dc, HIGH);
+    gpio_set_level(self->cs, LOW);
+    for (int j = y; j <= y_end; j++) {
+        spi_write(self, (x_end - x + 1) / 8, &self->frame->buf[j * stride + x / 8]);
+    }
+    gpio_set_level(self->cs, HIGH);
 }
 
 void display_epd2in9_set_frame_memory(display_display_obj_t *self) {
@@ -180,10 +210,15 @@ void display_epd2in9_clear_frame_memory(display_display_obj_t *self, unsigned ch
     display_epd2in9_set_memory_area(self, 0, 0, self->frame->width - 1, self->frame->height - 1);
     display_epd2in9_set_memory_pointer(self, 0, 0);
     display_epd2in9_send_command(self, WRITE_RAM);
-    /* send the image data */
-    for (int i = 0; i < self->frame->size; i++) {
-        display_epd2in9_send_data(self, color);
+    /* send the image data in blocks of one color */
+    uint8_t block[64];
+    memset(block, color, sizeof(block));
+    gpio_set_level(self->dc, HIGH);
+    gpio_set_level(self->cs, LOW);
+    for (int i = 0; i < self->frame->size; i += sizeof(block)) {
+        spi_write(self, MIN(sizeof(block), self->frame->size - i), block);
     }
+    gpio_set_level(self->cs, HIGH);
 }
 
 
@@ -65,11 +65,15 @@ void spi_write(display_display_obj_t *self, size_t len, const uint8_t* buf);
 int display_epd2in9_init(display_display_obj_t *self);
 void display_epd2in9_reset(display_display_obj_t *self);
 void display_epd2in9_send_lut(display_display_obj_t *self, const unsigned char *lut);
+void display_epd2in9_load_lut(display_display_obj_t *self, int mode);
 void display_epd2in9_flush(display_display_obj_t *self);
+void display_epd2in9_activate(display_display_obj_t *self);
 void display_epd2in9_send_command(display_display_obj_t *self, const uint8_t command);
 void display_epd2in9_send_data(display_display_obj_t *self, const uint8_t data);
 void display_epd2in9_send_data_buffer(display_display_obj_t *self, size_t len, const uint8_t* buf);
+void display_epd2in9_send(display_display_obj_t *self, const uint8_t command, size_t len, const uint8_t* buf);
 void display_epd2in9_wait_until_idle(display_display_obj_t *self);
+int display_epd2in9_is_busy(display_display_obj_t *self);
 
 void display_epd2in9_set_memory_area(display_display_obj_t *self, int x_start, int y_start, int x_end, int y_end);
 void display_epd2in9_set_memory_pointer(display_display_obj_t *self, int x, int y);
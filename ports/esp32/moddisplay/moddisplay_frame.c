@@ -32,6 +32,7 @@
 
 #include <stdlib.h>
 #include <math.h>
+#include <string.h>
 
 #include "moddisplay.h"
 #include "moddisplay_frame.h"
@@ -44,6 +45,8 @@ void display_frame_init(display_frame_t *frame, int width, int height, mp_obj_t
     mp_buffer_info_t bufinfo;
     mp_get_buffer_raise(frame->buf_obj, &bufinfo, MP_BUFFER_WRITE);
     frame->buf = bufinfo.buf;
+    display_frame_mark_clean(frame);
+    display_frame_mark_dirty(frame, 0, 0, frame->width - 1, frame->height - 1);
 }
 
 display_font_t* display_frame_get_font(int font) {
@@ -62,31 +65,129 @@ int display_frame_load_font(display_frame_t *frame, int font) {
     return frame->font == NULL ? FONT_NULL : frame->font->id;
 }
 
+void display_frame_mark_dirty(display_frame_t *frame, int x0, int y0, int x1, int y1) {
+    // the panel is written in whole bytes of 8 pixels
+    x0 &= ~7;
+    x1 |= 7;
+    if (frame->dirty[2] < frame->dirty[0]) {
+        frame->dirty[0] = x0;
+        frame->dirty[1] = y0;
+        frame->dirty[2] = x1;
+        frame->dirty[3] = y1;
+        return;
+    }
+    if (x0 < frame->dirty[0]) {
+        frame->dirty[0] = x0;
+    }
+    if (y0 < frame->dirty[1]) {
+        frame->dirty[1] = y0;
+    }
+    if (x1 > frame->dirty[2]) {
+        frame->dirty[2] = x1;
+    }
+    if (y1 > frame->dirty[3]) {
+        frame->dirty[3] = y1;
+    }
+}
+
+void display_frame_mark_clean(display_frame_t *frame) {
+    frame->dirty[0] = frame->width;
+    frame->dirty[1] = frame->height;
+    frame->dirty[2] = -1;
+    frame->dirty[3] = -1;
+}
+
 void display_frame_clear(display_frame_t *frame, uint8_t color) {
-    for (int x = 0; x < frame->width; x++) {
-        for (int y = 0; y < frame->height; y++) {
-            display_frame_draw_absolute_pixel(frame, x, y, color);
+    display_frame_mark_dirty(frame, 0, 0, frame->width - 1, frame->height - 1);
+    memset(frame->buf, (color != 0) != (frame->inverted != 0) ? 0xFF : 0x00, frame->size);
+}
+
+void display_frame_fill_absolute_rect(display_frame_t *frame, int x, int y, int width, int height, uint8_t color) {
+    int stride = frame->width / 8;
+    int x_end = x + width - 1;
+    int first = x >> 3, last = x_end >> 3;
+    // bits of the partial bytes at the left and right edge of each row
+    uint8_t left = 0xFF >> (x & 0x07);
+    uint8_t right = 0xFF << (7 - (x_end & 0x07));
+    uint8_t *row;
+    if (frame->inverted) {
+        color = color ? 0 : 1;
+    }
+    display_frame_mark_dirty(frame, x, y, x_end, y + height - 1);
+    if (x == 0 && width == frame->width) {
+        // whole rows are contiguous
+        memset(&frame->buf[y * stride], color ? 0xFF : 0x00, height * stride);
+        return;
+    }
+    if (first == last) {
+        left &= right;
+    }
+    for (row = &frame->buf[y * stride]; height > 0; height--, row += stride) {
+        row[first] = color ? row[first] | left : row[first] & ~left;
+        if (first == last) {
+            continue;
+        }
+        if (last - first > 1) {
+            memset(&row[first + 1], color ? 0xFF : 0x00, last - first - 1);
         }
+        row[last] = color ? row[last] | right : row[last] & ~right;
+    }
+}
+
+void display_frame_fill_rect(display_frame_t *frame, int x, int y, int width, int height, uint8_t color) {
+    int rect[4];
+    if (display_frame_absolute_rect(frame, x, y, width, height, rect)) {
+        display_frame_fill_absolute_rect(frame, rect[0], rect[1], rect[2], rect[3], color);
     }
 }
 
 void display_frame_fill(display_frame_t *frame, const uint8_t* buffer, int x, int y, int width, int height) {
     int max_width = frame->rotation == ROTATE_0 || frame->rotation == ROTATE_180 ? frame->width : frame->height;
     int max_height = frame->rotation == ROTATE_0 || frame->rotation == ROTATE_180 ? frame->height : frame->width;
-    int c, r;
-    uint8_t color;
-    const uint8_t *ptr = buffer;
-    for (int i = 0; i < width * height; i++) {
-        int idx = i % 8;
-        uint8_t bit = 1 << (7 - idx);
-        color = (*ptr & bit) == bit ? 1 : 0;
-        c = x + (i % width);
-        r = y + ((i - (i % width)) / width);
-        if (c < max_width && r < max_height) {
-            display_frame_draw_pixel(frame, c, r, color);
+    int stride = frame->width / 8;
+    // the visible part of the image
+    int c_start = x < 0 ? -x : 0;
+    int c_end = x + width > max_width ? max_width - x : width;
+    int r_start = y < 0 ? -y : 0;
+    int r_end = y + height > max_height ? max_height - y : height;
+    int nx, ny, dx, dy, bit, rect[4];
+    uint8_t color, mask;
+    if (!display_frame_absolute_rect(frame, x + c_start, y + r_start, c_end - c_start, r_end - r_start, rect)) {
+        return;
+    }
+    display_frame_mark_dirty(frame, rect[0], rect[1], rect[0] + rect[2] - 1, rect[1] + rect[3] - 1);
+    // step in the frame buffer for the next pixel of an image row
+    dx = frame->rotation == ROTATE_0 ? 1 : frame->rotation == ROTATE_180 ? -1 : 0;
+    dy = frame->rotation == ROTATE_90 ? 1 : frame->rotation == ROTATE_270 ? -1 : 0;
+    for (int r = r_start; r < r_end; r++) {
+        // absolute position of the first visible pixel of the row
+        int c = x + c_start, l = y + r;
+        if (frame->rotation == ROTATE_0) {
+            nx = c;
+            ny = l;
+        } else if (frame->rotation == ROTATE_90) {
+            nx = frame->width - l - 1;
+            ny = c;
+        } else if (frame->rotation == ROTATE_180) {
+            nx = frame->width - c - 1;
+            ny = frame->height - l - 1;
+        } else {
+            nx = l;
+            ny = frame->height - c - 1;
         }
-        if (idx == 7) {
-            ptr++;
+        // the image is a stream of bits, rows don't start on a new byte
+        bit = r * width + c_start;
+        for (int i = c_start; i < c_end; i++, bit++, nx += dx, ny += dy) {
+            color = (buffer[bit >> 3] >> (7 - (bit & 0x07))) & 0x01;
+            if (frame->inverted) {
+                color ^= 0x01;
+            }
+            mask = 0x80 >> (nx & 0x07);
+            if (color) {
+                frame->buf[ny * stride + (nx >> 3)] |= mask;
+            } else {
+                frame->buf[ny * stride + (nx >> 3)] &= ~mask;
+            }
         }
     }
 }
@@ -98,6 +199,9 @@ void display_frame_draw_absolute_pixel(display_frame_t *frame, int x, int y, uin
     if (frame->inverted) {
         color = color ? 0 : 1;
     }
+    if (x < frame->dirty[0] || x > frame->dirty[2] || y < frame->dirty[1] || y > frame->dirty[3]) {
+        display_frame_mark_dirty(frame, x, y, x, y);
+    }
     size_t index = (x + y * frame->width) >> 3;
     int offset = 7 - (x & 0x07);
     ((uint8_t*)frame->buf)[index] = (((uint8_t*)frame->buf)[index] & ~(0x01 << offset)) | ((color != 0) << offset);
@@ -181,6 +285,73 @@ uint8_t display_frame_get_pixel(display_frame_t *frame, int x, int y) {
     return -1;
 }
 
+int display_frame_absolute_rect(display_frame_t *frame, int x, int y, int width, int height, int* rect) {
+    int point_temp, x0, y0, x1, y1;
+    int rotated = frame->rotation == ROTATE_90 || frame->rotation == ROTATE_270;
+    int max_x = rotated ? frame->height : frame->width;
+    int max_y = rotated ? frame->width : frame->height;
+    x0 = x < 0 ? 0 : x;
+    y0 = y < 0 ? 0 : y;
+    x1 = (x + width > max_x ? max_x : x + width) - 1;
+    y1 = (y + height > max_y ? max_y : y + height) - 1;
+    if (x1 < x0 || y1 < y0) {
+        return 0;
+    }
+    if (frame->rotation == ROTATE_90) {
+        point_temp = x0;
+        x0 = frame->width - y1 - 1;
+        y1 = x1;
+        x1 = frame->width - y0 - 1;
+        y0 = point_temp;
+    } else if (frame->rotation == ROTATE_180) {
+        point_temp = x0;
+        x0 = frame->width - x1 - 1;
+        x1 = frame->width - point_temp - 1;
+        point_temp = y0;
+        y0 = frame->height - y1 - 1;
+        y1 = frame->height - point_temp - 1;
+    } else if (frame->rotation == ROTATE_270) {
+        point_temp = y0;
+        y0 = frame->height - x1 - 1;
+        x1 = y1;
+        y1 = frame->height - x0 - 1;
+        x0 = point_temp;
+    }
+    rect[0] = x0;
+    rect[1] = y0;
+    rect[2] = x1 - x0 + 1;
+    rect[3] = y1 - y0 + 1;
+    return 1;
+}
+
+void display_frame_relative_rect(display_frame_t *frame, int x0, int y0, int x1, int y1, int* rect) {
+    int point_temp;
+    if (frame->rotation == ROTATE_90) {
+        point_temp = x0;
+        x0 = y0;
+        y0 = frame->width - x1 - 1;
+        x1 = y1;
+        y1 = frame->width - point_temp - 1;
+    } else if (frame->rotation == ROTATE_180) {
+        point_temp = x0;
+        x0 = frame->width - x1 - 1;
+        x1 = frame->width - point_temp - 1;
+        point_temp = y0;
+        y0 = frame->height - y1 - 1;
+        y1 = frame->height - point_temp - 1;
+    } else if (frame->rotation == ROTATE_270) {
+        point_temp = x0;
+        x0 = frame->height - y1 - 1;
+        y1 = x1;
+        x1 = frame->height - y0 - 1;
+        y0 = point_temp;
+    }
+    rect[0] = x0;
+    rect[1] = y0;
+    rect[2] = x1 - x0 + 1;
+    rect[3] = y1 - y0 + 1;
+}
+
 int display_frame_draw_char_at(display_frame_t *frame, int x, int y, uint8_t ascii_char, uint8_t color) {
     if (frame->font == NULL) {
         return 0;
@@ -284,17 +455,11 @@ void display_frame_draw_line(display_frame_t *frame, int x0, int y0, int x1, int
 }
 
 void display_frame_draw_horizontal_line(display_frame_t *frame, int x, int y, int width, uint8_t color) {
-    int i;
-    for (i = x; i < x + width; i++) {
-        display_frame_draw_pixel(frame, i, y, color);
-    }
+    display_frame_fill_rect(frame, x, y, width, 1, color);
 }
 
 void display_frame_draw_vertical_line(display_frame_t *frame, int x, int y, int height, uint8_t color) {
-    int i;
-    for (i = y; i < y + height; i++) {
-        display_frame_draw_pixel(frame, x, i, color);
-    }
+    display_frame_fill_rect(frame, x, y, 1, height, color);
 }
 
 void display_frame_draw_rectangle(display_frame_t *frame, int x0, int y0, int x1, int y1, uint8_t color) {
@@ -312,15 +477,12 @@ void display_frame_draw_rectangle(display_frame_t *frame, int x0, int y0, int x1
 
 void display_frame_draw_filled_rectangle(display_frame_t *frame, int x0, int y0, int x1, int y1, uint8_t color) {
     int min_x, min_y, max_x, max_y;
-    int i;
     min_x = x1 > x0 ? x0 : x1;
     max_x = x1 > x0 ? x1 : x0;
     min_y = y1 > y0 ? y0 : y1;
     max_y = y1 > y0 ? y1 : y0;
 
-    for (i = min_x; i < max_x; i++) {
-      display_frame_draw_vertical_line(frame, i, min_y, max_y - min_y, color);
-    }
+    display_frame_fill_rect(frame, min_x, min_y, max_x - min_x, max_y - min_y, color);
 }
 
 void display_frame_draw_circle(display_frame_t *frame, int x, int y, int radius, uint8_t color) {
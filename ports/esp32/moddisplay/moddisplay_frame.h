@@ -45,17 +45,25 @@ typedef struct _display_frame_t {
     mp_obj_t buf_obj;
     unsigned char *buf;
     unsigned int size, width, height;
+    // byte aligned bounding box x0, y0, x1, y1 of the pixels drawn since the last update, empty if x1 < x0
+    int dirty[4];
 } display_frame_t;
 
 void display_frame_init(display_frame_t *frame, int width, int height, mp_obj_t buf_obj);
 display_font_t* display_frame_get_font(int font);
 int display_frame_load_font(display_frame_t *frame, int font);
+void display_frame_mark_dirty(display_frame_t *frame, int x0, int y0, int x1, int y1);
+void display_frame_mark_clean(display_frame_t *frame);
 void display_frame_clear(display_frame_t *frame, uint8_t color);
+void display_frame_fill_absolute_rect(display_frame_t *frame, int x, int y, int width, int height, uint8_t color);
+void display_frame_fill_rect(display_frame_t *frame, int x, int y, int width, int height, uint8_t color);
 void display_frame_fill(display_frame_t *frame, const uint8_t* buffer, int x, int y, int width, int height);
 void display_frame_draw_absolute_pixel(display_frame_t *frame, int x, int y, uint8_t color);
 uint8_t display_frame_get_absolute_pixel(display_frame_t *frame, int x, int y);
 void display_frame_draw_pixel(display_frame_t *frame, int x, int y, uint8_t color);
 uint8_t display_frame_get_pixel(display_frame_t *frame, int x, int y);
+int display_frame_absolute_rect(display_frame_t *frame, int x, int y, int width, int height, int* rect);
+void display_frame_relative_rect(display_frame_t *frame, int x0, int y0, int x1, int y1, int* rect);
 int display_frame_draw_char_at(display_frame_t *frame, int x, int y, uint8_t ascii_char, uint8_t color);
 void display_frame_draw_string_at(display_frame_t *frame, int x, int y, const uint8_t* text, uint8_t color, uint8_t wrap, int max_width, int* dimensions);
 void display_frame_draw_line(display_frame_t *frame, int x0, int y0, int x1, int y1, uint8_t color);
@@ -45,6 +45,8 @@ Q(FOREGROUND)
 Q(NO_WRAP)
 Q(WRAP_INDENT)
 Q(WRAP_LINE_START)
+Q(MODE_PARTIAL)
+Q(MODE_FULL)
 // Fonts
 #include "moddisplay/fonts/qstrdefs.h"
 // Functions
@@ -69,3 +71,16 @@ Q(arc)
 Q(fill_arc)
 Q(fill_bytes)
 Q(fill_b64)
+Q(transfers)
+Q(busy)
+Q(dirty)
+
+// Arguments
+Q(x)
+Q(y)
+Q(width)
+Q(height)
+Q(full)
+Q(wait)
+Q(mode)
+Q(dump)
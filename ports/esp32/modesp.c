@@ -36,6 +36,11 @@
 #include "py/runtime.h"
 #include "py/mperrno.h"
 #include "py/mphal.h"
+#include "py/stream.h"
+#include "py/lexer.h"
+#include "py/parse.h"
+#include "py/compile.h"
+#include "py/persistentcode.h"
 #include "drivers/dht/dht.h"
 #include "modesp.h"
 
@@ -122,6 +127,25 @@ STATIC mp_obj_t esp_neopixel_write_(mp_obj_t pin, mp_obj_t buf, mp_obj_t timing)
 }
 STATIC MP_DEFINE_CONST_FUN_OBJ_3(esp_neopixel_write_obj, esp_neopixel_write_);
 
+#if MICROPY_PERSISTENT_CODE_SAVE
+STATIC void esp_stream_print_strn(void *env, const char *str, size_t len) {
+    mp_stream_write(MP_OBJ_FROM_PTR(env), str, len, MP_STREAM_RW_WRITE);
+}
+
+// Compiles a source file to bytecode and writes it in .mpy format to a stream opened for binary writing
+STATIC mp_obj_t esp_compile_mpy(mp_obj_t source_in, mp_obj_t dest_in) {
+    mp_get_stream_raise(dest_in, MP_STREAM_OP_WRITE);
+    mp_lexer_t *lex = mp_lexer_new_from_file(mp_obj_str_get_str(source_in));
+    qstr source_name = lex->source_name;
+    mp_parse_tree_t parse_tree = mp_parse(lex, MP_PARSE_FILE_INPUT);
+    mp_raw_code_t *rc = mp_compile_to_raw_code(&parse_tree, source_name, MP_EMIT_OPT_NONE, false);
+    mp_print_t print = {MP_OBJ_TO_PTR(dest_in), esp_stream_print_strn};
+    mp_raw_code_save(rc, &print);
+    return mp_const_none;
+}
+STATIC MP_DEFINE_CONST_FUN_OBJ_2(esp_compile_mpy_obj, esp_compile_mpy);
+#endif
+
 STATIC const mp_rom_map_elem_t esp_module_globals_table[] = {
     { MP_ROM_QSTR(MP_QSTR___name__), MP_ROM_QSTR(MP_QSTR_esp) },
 
@@ -139,6 +163,10 @@ STATIC const mp_rom_map_elem_t esp_module_globals_table[] = {
     { MP_ROM_QSTR(MP_QSTR_neopixel_write), MP_ROM_PTR(&esp_neopixel_write_obj) },
     { MP_ROM_QSTR(MP_QSTR_dht_readinto), MP_ROM_PTR(&dht_readinto_obj) },
 
+    #if MICROPY_PERSISTENT_CODE_SAVE
+    { MP_ROM_QSTR(MP_QSTR_compile_mpy), MP_ROM_PTR(&esp_compile_mpy_obj) },
+    #endif
+
     // Constants for second arg of osdebug()
     { MP_ROM_QSTR(MP_QSTR_LOG_NONE), MP_ROM_INT((mp_uint_t)ESP_LOG_NONE)},
     { MP_ROM_QSTR(MP_QSTR_LOG_ERROR), MP_ROM_INT((mp_uint_t)ESP_LOG_ERROR)},
@@ -37,15 +37,29 @@ class AuthScreen(screen.Screen):
 
     HIDE_KERNEL = True
 
+    code = None
+    failed = False
+
+    def register(self):
+        self.code = None
+        self.failed = False
+        self.events.on('worker.auth', self.on_auth_code)
+        if not self.kernel.worker.pending('auth'):
+            self.failed = not self.kernel.worker.submit('auth', self.kernel.auth_code)
+
+    def on_auth_code(self, event):
+        self.code = event.result
+        self.failed = not event.result
+        self.do_render()
+
     def update(self, delta=0):
         self.display.fill(display.BACKGROUND)
-        auth_code = self.kernel.auth_code()
-        if not auth_code:
-            self.display.fill(display.BACKGROUND)
+        if self.code:
+            self.display.text('{}'.format(self.code), 0, y=0, wrap=display.WRAP_INDENT)
+        elif self.failed:
             self.display.text('Could not get an auth code from server', 0, y=0, wrap=display.WRAP_INDENT)
         else:
-            self.display.fill(display.BACKGROUND)
-            self.display.text('{}'.format(auth_code), 0, y=0, wrap=display.WRAP_INDENT)
+            self.display.text('Requesting an auth code...', 0, y=0, wrap=display.WRAP_INDENT)
         self.display.update()
 
 
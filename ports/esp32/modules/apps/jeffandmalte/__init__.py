@@ -60,6 +60,7 @@ class GalleryScreen(screen.Screen):
         self.events.on('input.up.{}'.format(Input.key_name(Input.BTN_LEFT)), self.nav_left)
         self.events.on('input.up.{}'.format(Input.key_name(Input.BTN_RIGHT)), self.nav_right)
         self.events.on('input.up.{}'.format(Input.key_name(Input.BTN_A)), self.set_image)
+        self.events.on('worker.image', self.on_image_sent)
 
     def nav_left(self, event):
         self.IMAGE = (len(self.IMAGES) + self.IMAGE - 1) % len(self.IMAGES)
@@ -75,7 +76,11 @@ class GalleryScreen(screen.Screen):
     def set_image(self, event):
         self.display.fill(display.BACKGROUND)
         self.display.text('Sending image to the Server...', 0, line=1, update=True)
-        r = self.http.post('/image', json={'image': self.IMAGES[self.IMAGE]})
+        if not self.kernel.worker.submit('image', self.http.post, '/image', json={'image': self.IMAGES[self.IMAGE]}):
+            self.display.text('Something went wrong. Try again!', 0, line=2, update=True)
+
+    def on_image_sent(self, event):
+        r = event.result
         if r is None or r.status_code is not 204:
             self.display.text('Something went wrong. Try again!', 0, line=2, update=True)
         else:
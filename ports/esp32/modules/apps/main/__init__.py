@@ -29,36 +29,10 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 from system import app, screen, Kernel
-import os
-import json
-import gc
 
 
 class MenuScreen(screen.Screen):
 
-    APP_INFO = {}
-
-    @staticmethod
-    def app_infos(kernel):
-        try:
-            for app in os.listdir('/apps'):
-                if app == 'main':
-                    continue
-                info = MenuScreen.APP_INFO.get(app, None)
-                if info is None:
-                    app_info = kernel.app_info(app)
-                    title = kernel.title(app, app_info)
-                    if not title:
-                        continue
-                    active = kernel.active(app)
-                    if not active:
-                        continue
-                    info = {'text': title, 'action': app}
-                    MenuScreen.APP_INFO[app] = info
-            json.dump(MenuScreen.APP_INFO, open('/menu.json', 'w+'))
-        except OSError:
-            pass
-
     def register(self):
         self.events.on('input.hnzlmnn', self.hnzlmnn)
 
@@ -68,13 +42,12 @@ class MenuScreen(screen.Screen):
         self.MENU_ITEMS.append({'text': 'Name', 'action': Kernel.NAME_APP})
         self.MENU_ITEMS.append({'text': 'Auth', 'action': Kernel.AUTH_APP})
         try:
-            infos = json.load(open('/menu.json', 'r'))
+            infos = self.kernel.registry.menu()
             for app in sorted(infos.keys()):
                 self.MENU_ITEMS.append(infos[app])
         except:
             pass
         self.MENU_ITEMS.append({"text": "Settings", "action": Kernel.SETTINGS_APP})
-        gc.collect()
 
     def on_menu_selection(self, item):
         if isinstance(item['action'], str):
@@ -83,6 +56,10 @@ class MenuScreen(screen.Screen):
     def hnzlmnn(self, event):
         if not self.menu:
             return
+        # The entries outlive the menu while the app is suspended
+        for entry in self.menu.entries:
+            if entry['action'] == 'jeffandmalte':
+                return
         self.menu.entries.append({'text': 'Gallery', 'action': 'jeffandmalte'})
         return Kernel.ACTION_RELOAD
 
@@ -96,6 +73,8 @@ class App(app.App):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.screens.append(MenuScreen(self))
+        # The screen did not exist yet when App.__init__ passed on the arguments
+        self.screens[0].init(**kwargs)
 
 
 
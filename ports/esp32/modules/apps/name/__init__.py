@@ -66,12 +66,13 @@ class NameScreen(screen.Screen):
             76, 0, 144, 128, update=True)
 
     def check_back(self, event):
+        # B and START are part of sequences, keep listening if one of them is being entered
         if event.code is Input.BTN_B:
-            if self.input.KONAMI_COUNTER is 8:
+            if self.input.sequence_progress('konami') == 8:
                 return
-            if self.input.CYBAER_COUNTER is 4 or self.input.CYBAER_COUNTER is 5:
+            if self.input.sequence_progress('cybaer') in (4, 5):
                 return
-        if event.code is Input.BTN_START and self.input.CYBAER_COUNTER is 6:
+        if event.code is Input.BTN_START and self.input.sequence_progress('cybaer') == 6:
             return
         return self.back(event)
 
@@ -55,6 +55,17 @@ class SettingsScreen(screen.Screen):
 
     def register(self):
         self.events.on('input.hnzlmnn', self.hnzlmnn)
+        self.events.on('worker.sync', self.on_sync)
+        if not self.kernel.worker.pending('sync'):
+            self.label(self.ACTION_NAME, 'Change name')
+
+    def label(self, action, text):
+        """
+        Changes the text of a menu entry, used to show the progress of background jobs
+        """
+        for item in self.MENU_ITEMS:
+            if item['action'] == action:
+                item['text'] = text
 
     def on_menu_selection(self, item):
         if item['action'] == self.ACTION_WIFI:
@@ -77,18 +88,27 @@ class SettingsScreen(screen.Screen):
             self.storage['OTA_SERVER'] = event.value
         elif event.context is self.CONTEXT_NAME:
             self.storage['NAME'] = event.value
-            self.display.fill(display.BACKGROUND)
-            self.display.text('Saving name to the cloud...', 0, y=0, wrap=display.WRAP_INDENT, update=True)
-            self.display.fill(display.BACKGROUND)
-            self.storage.sync()
-            if self.kernel.reason is Kernel.START_NAME:
-                self.kernel.safe_reset()
+            if self.kernel.worker.submit('sync', self.storage.sync):
+                # Shown by the render following this event
+                self.label(self.ACTION_NAME, 'Saving name to the cloud...')
+            else:
+                # The worker is busy, saving blocks instead of dropping the name
+                self.storage.sync()
+                if self.kernel.reason is Kernel.START_NAME:
+                    self.kernel.safe_reset()
         elif event.context is self.CONTEXT_RESET:
             if event.value.lower() == 'yes':
                 self.display.fill(display.BACKGROUND)
                 self.display.text('Resetting badge...', 0, y=0, wrap=display.WRAP_INDENT, update=True)
                 self.kernel.factory()
 
+    def on_sync(self, event):
+        if self.kernel.reason is Kernel.START_NAME:
+            self.kernel.safe_reset()
+        self.label(self.ACTION_NAME, 'Change name')
+        if self.menu:
+            self.menu.update()
+
     def back(self, event):
         return Kernel.ACTION_LOAD_APP, Kernel.DEFAULT_APP
 
@@ -30,7 +30,7 @@
 
 import machine
 
-from system import JSONLogger, Kernel
+from system import JSONLogger, Kernel, BootProfiler, Snapshot
 
 class Bootstrap:
     def __init__(self):
@@ -38,10 +38,17 @@ class Bootstrap:
 
     def run(self):
         logger = JSONLogger('error.log', JSONLogger.WARNING, do_print=True)
+        profiler = BootProfiler()
         try:
-            kernel = Kernel(logger)
-            kernel.ensure_registration()
             reset_cause = machine.reset_cause()
+            if reset_cause is machine.DEEPSLEEP_RESET:
+                snapshot = Snapshot.load()
+                if snapshot:
+                    Snapshot.clear()
+                    return Kernel(logger, profiler, snapshot=snapshot).start(Kernel.START_SLEEP)
+            # Waking up from deep sleep goes straight to the menu, no need to associate in the background
+            kernel = Kernel(logger, profiler, connect=reset_cause is not machine.DEEPSLEEP_RESET)
+            profiler.measure('ensure_registration', kernel.ensure_registration)
             if reset_cause is machine.DEEPSLEEP_RESET:
                 return kernel.start(Kernel.START_SLEEP)
             kernel.display.clear()
@@ -52,10 +59,10 @@ class Bootstrap:
             kernel.lights.troopers(lights=[0])
             if kernel.storage.NAME is None:
                 return kernel.start(Kernel.START_NAME)
-            if not kernel.wifi(10000):
+            if not profiler.measure('wifi', kernel.wifi, 10000):
                 return kernel.start(Kernel.START_WIFI)
             kernel.lights.troopers(lights=[0, 1])
-            registration = kernel.ensure_registration()
+            registration = profiler.measure('ensure_registration', kernel.ensure_registration)
             if registration is 1:
                 return kernel.start(Kernel.START_REGISTRATION)
             elif registration is 2:
@@ -63,10 +70,11 @@ class Bootstrap:
             elif registration is 3:
                 return kernel.start(Kernel.START_BACKEND)
             kernel.lights.troopers(lights=[0, 1, 2])
-            if kernel.ota():
+            if profiler.measure('ota', kernel.ota):
+                profiler.save()
                 kernel.safe_reset()
             kernel.lights.troopers(lights=[0, 1, 2, 3])
-            kernel.storage.update()
+            profiler.measure('storage_update', kernel.storage.update)
             kernel.lights.troopers(lights=[0, 1, 2, 3, 4])
             return kernel.start()
         except KeyboardInterrupt:
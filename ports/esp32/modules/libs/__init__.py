@@ -28,12 +28,12 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-from .display import Display
+from .display import Display, RefreshPolicy
 from .requests import delete, get, head, patch, post, put
 from .http import HTTP
 from .tarfile import TarFile, TarInfo, FileSection, DIRTYPE, REGTYPE
 from .shutil import copyfileobj, rmtree, ensure
-from .pca95XX import PCA95XX
+from .pca95XX import PCA95XX, IRQRing
 from .pca9539a import PCA9539A
 from .pca9555 import PCA9555
 from .lis3dh import LIS3DH_I2C
@@ -37,15 +37,92 @@ from micropython import const
 EPD_WIDTH  = const(128)
 EPD_HEIGHT = const(296)
 
+
+class RefreshPolicy:
+    """
+    Chooses the waveform of each update. The partial waveform is fast but leaves ghosting behind, so partial refreshes
+    are counted per region of the screen. Once a region reached the threshold the next update is a clean full refresh.
+    """
+
+    THRESHOLD = 10
+    COLUMNS = 4
+    ROWS = 2
+
+    def __init__(self, threshold=None, columns=None, rows=None):
+        """
+        :param threshold: Partial refreshes of a region before a full refresh, at most 255
+        :param columns: Regions across the screen
+        :param rows: Regions down the screen
+        """
+        self.threshold = threshold or self.THRESHOLD
+        self.columns = columns or self.COLUMNS
+        self.rows = rows or self.ROWS
+        self.counts = bytearray(self.columns * self.rows)
+        self.full = False
+
+    def request_full(self):
+        """
+        Makes the next update a full refresh, e.g. after a screen change
+        """
+        self.full = True
+
+    def count(self, area, width, height):
+        """
+        Counts a partial refresh of the regions the area overlaps
+        :param area: (x, y, width, height) that is refreshed, None if nothing changed
+        :param width, height: Size of the screen
+        :return: True if a region reached the threshold
+        """
+        if area is None:
+            return False
+        x, y, w, h = area
+        c0 = max(0, x * self.columns // width)
+        c1 = min(self.columns - 1, (x + w - 1) * self.columns // width)
+        r0 = max(0, y * self.rows // height)
+        r1 = min(self.rows - 1, (y + h - 1) * self.rows // height)
+        reached = False
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                i = r * self.columns + c
+                count = self.counts[i] + 1 if self.counts[i] < 255 else 255
+                self.counts[i] = count
+                if count >= self.threshold:
+                    reached = True
+        return reached
+
+    def choose(self, area, width, height):
+        """
+        :return: display.MODE_FULL if the area should be updated with a full refresh, else display.MODE_PARTIAL
+        """
+        if self.full or self.count(area, width, height):
+            return display.MODE_FULL
+        return display.MODE_PARTIAL
+
+    def reset(self):
+        """
+        Called after a full refresh removed the ghosting
+        """
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.full = False
+
+
 class Display:
 
     # 0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~
     default_rotation = display.ROTATE_90
     default_font = display.FONT_DEJAVU_12
     default_inverted = True
-
-    def __init__(self):
-        self.spi = SPI(1, baudrate=20000000, bits=8, polarity=0, phase=0, sck=Pin(18), mosi=Pin(23), miso=Pin(5))
+    default_baudrate = 20000000
+
+    def __init__(self, baudrate=None, policy=True):
+        """
+        :param baudrate: SPI clock in Hz, default_baudrate if None
+        :param policy: RefreshPolicy choosing the waveform of updates without a mode, True for the default one
+        """
+        self.baudrate = baudrate or self.default_baudrate
+        self.policy = RefreshPolicy() if policy is True else policy
+        self.spi = SPI(1, baudrate=self.baudrate, bits=8, polarity=0, phase=0, sck=Pin(18), mosi=Pin(23), miso=Pin(5))
         self.spi.init()
         cs = Pin(25)
         dc = Pin(27)
@@ -56,6 +133,15 @@ class Display:
         dc.init(dc.OUT, value=0)
         rst.init(rst.OUT, value=0)
         busy.init(busy.IN)
+        # BUSY falls when the panel finished a refresh
+        busy.irq(trigger=Pin.IRQ_FALLING, handler=self._on_idle)
+        self.busy_pin = busy
+        # An update(wait=False) is refreshing the panel
+        self.refreshing = False
+        # Set by the interrupt when that refresh finished, cleared by whoever handles it
+        self.refreshed = False
+        # Called from the interrupt after a refresh finished, e.g. to wake the event loop
+        self.wake = None
 
         self.buffer = bytearray(EPD_WIDTH // 8 * EPD_HEIGHT)
         self.display = display.Display(self.buffer, self.spi, 128, 296,
@@ -147,8 +233,60 @@ class Display:
         self.display.inverted(self.default_inverted)
         self.display.inverted(self.default_rotation)
 
-    def update(self):
-        self.display.update()
+    def update(self, x=None, y=None, width=None, height=None, full=False, wait=True, mode=None):
+        """
+        Sends the pixels drawn since the last update, the window x, y, width, height or with full the whole frame
+        to the panel and refreshes it.
+        :param wait: False to return once the frame is in the panel's RAM and keep drawing the next one during the
+        refresh, which sets refreshed when it is done. An update during the refresh waits for it.
+        :param mode: display.MODE_PARTIAL for a fast refresh, display.MODE_FULL for a clean one, None to let the
+        policy decide
+        :return: Number of bytes sent
+        """
+        policy = self.policy
+        if policy and mode is not display.MODE_FULL:
+            area = self.display.dirty() if x is None else (x, y, width, height)
+            if full:
+                area = (0, 0, self.width, self.height)
+            if mode is None:
+                mode = policy.choose(area, self.width, self.height)
+            else:
+                policy.count(area, self.width, self.height)
+        if x is None:
+            sent = self.display.update(full=full, wait=wait, mode=mode)
+        else:
+            sent = self.display.update(x, y, width, height, full=full, wait=wait, mode=mode)
+        if policy and sent and mode is display.MODE_FULL:
+            policy.reset()
+        if not wait and sent:
+            self.refreshed = False
+            self.refreshing = True
+            if not self.display.busy():
+                # Finished before the flag was set
+                self._on_idle(self.busy_pin)
+        return sent
+
+    def _on_idle(self, pin):
+        if self.refreshing:
+            self.refreshing = False
+            self.refreshed = True
+            if self.wake:
+                self.wake()
+
+    def clock(self, baudrate=None):
+        """
+        Gets or sets the SPI clock used to send the frame to the panel.
+        """
+        if baudrate is None:
+            return self.baudrate
+        self.baudrate = baudrate
+        self.spi.init(baudrate=baudrate)
+
+    def transfers(self):
+        """
+        :return: (bytes, transactions, us) sent over SPI by the last update
+        """
+        return self.display.transfers()
 
     def font(self, font=None):
         if font is None:
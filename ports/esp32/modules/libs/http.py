@@ -32,7 +32,6 @@ import libs.requests as requests
 import uhashlib
 import ubinascii
 import ujson
-import gc
 
 
 class HTTP:
@@ -56,7 +55,7 @@ class HTTP:
                     lines[0] = lines[0].replace('-----BEGIN CERTIFICATE-----', '')
                     lines[-1] = lines[-1].replace('-----END CERTIFICATE-----', '')
                     self.certs.append(ubinascii.a2b_base64(''.join(lines)))
-            gc.collect()
+            self.kernel.heap.collect('http')
         except OSError:
             pass
 
@@ -309,7 +309,9 @@ class LIS3DH:
 
     def _read_register(self, register, length):
         # Read an arbitrarily long register (specified by length number of
-        # bytes) and return a bytearray of the retrieved data.
+        # bytes) and return a buffer of the retrieved data. The buffer may be
+        # shared with the next register transfer, so callers unpack it right
+        # away and never keep it.
         # Subclasses MUST implement this!
         raise NotImplementedError
 
@@ -326,11 +328,17 @@ class LIS3DH_I2C(LIS3DH):
         self.address = address
         self._i2c = i2c
         self._buffer = bytearray(6)
+        # Views of the first n bytes of the buffer, so register transfers don't allocate
+        self._views = [memoryview(self._buffer)[:n] for n in range(7)]
         super().__init__(int1=int1, int2=int2)
     def _read_register(self, register, length):
-        return self._i2c.readfrom_mem(self.address,register,length)
+        if length > len(self._buffer):
+            return self._i2c.readfrom_mem(self.address,register,length)
+        # A view of the shared buffer, overwritten by the next register transfer (see LIS3DH._read_register)
+        view = self._views[length]
+        self._i2c.readfrom_mem_into(self.address,register,view)
+        return view
 
     def _write_register_byte(self, register, value):
-        self._buffer[0] = register & 0xFF
-        self._buffer[1] = value & 0xFF
-        self._i2c.writeto(self.address, self._buffer[0:2])
+        self._buffer[0] = value & 0xFF
+        self._i2c.writeto_mem(self.address, register & 0xFF, self._views[1])
@@ -37,13 +37,7 @@ from libs import PCA95XX
 class PCA9539A(PCA95XX):
 
 
-    def read_port(self, port=0x00):
-        # Select the port
-        if type(port) is not bytearray:
-            port = bytearray(port)
-        self.i2c.writeto(self.address, port)
-        return self.i2c.readfrom(self.address, 1)[0]
-
     def read_state(self):
-        # P0_7 ... P0_0 ... P1_7 ... P0_0
-        return ('0' * 8 + bin(self.read_port(0x00))[2:])[-8:] + ('0' * 8 + bin(self.read_port(0x01))[2:])[-8:]
+        # P1_7 ... P1_0 P0_7 ... P0_0, the buttons are wired to port 0
+        b = self.read_ports()
+        return (b[1] << 8) | b[0]
@@ -36,17 +36,10 @@ from libs import PCA95XX
 
 class PCA9555(PCA95XX):
 
-    ACTIVE = '0'
-    INACTIVE = '1'
-
-    def read_port(self, port=0x00):
-        # Select the port
-        if type(port) is not bytearray:
-            port = bytearray(port)
-        self.i2c.writeto(self.address, port)
-        return self.i2c.readfrom(self.address, 2)
+    ACTIVE = 0
+    INACTIVE = 1
 
     def read_state(self):
-        # P0_7 ... P0_0 ... P1_7 ... P0_0
-        b = self.read_port(0x01)
-        return ('0' * 8 + bin(b[0])[2:])[-8:] + ('0' * 8 + bin(b[1])[2:])[-8:]
+        # P0_7 ... P0_0 P1_7 ... P1_0
+        b = self.read_ports()
+        return (b[0] << 8) | b[1]
@@ -34,22 +34,127 @@ import machine
 from machine import Pin
 
 
+class IRQRing:
+    """
+    Fixed size ring of expander interrupts. The pin handlers only record which expander fired and when, the event loop
+    drains the ring and does the I2C reads and key handling. The pin handlers write head and the drain writes tail,
+    so the two don't need a lock. One slot stays empty to tell a full ring from an empty one.
+    """
+
+    SIZE = 16
+
+    def __init__(self, size=None):
+        self.size = (size if size else self.SIZE) + 1
+        self.devices = [None] * self.size
+        self.ticks = [0] * self.size
+        self.head = 0
+        self.tail = 0
+        # Interrupts dropped because the ring was full
+        self.overflows = 0
+        # Interrupts handled and their latency between interrupt and drain in us
+        self.drained = 0
+        self.latency_total = 0
+        self.latency_max = 0
+        # Called after an interrupt was recorded, e.g. to wake the event loop
+        self.wake = None
+
+    def push(self, device):
+        head = (self.head + 1) % self.size
+        if head == self.tail:
+            self.overflows += 1
+            return False
+        self.devices[self.head] = device
+        self.ticks[self.head] = time.ticks_us()
+        self.head = head
+        if self.wake:
+            self.wake()
+        return True
+
+    def drain(self):
+        """
+        Handles the recorded interrupts
+        :return: Number of interrupts handled
+        """
+        count = 0
+        while self.tail != self.head:
+            tail = self.tail
+            device = self.devices[tail]
+            # Read before the slot is released, the next push may overwrite it
+            ticks = self.ticks[tail]
+            latency = time.ticks_diff(time.ticks_us(), ticks)
+            self.devices[tail] = None
+            self.tail = (tail + 1) % self.size
+            self.drained += 1
+            self.latency_total += latency
+            if latency > self.latency_max:
+                self.latency_max = latency
+            count += 1
+            # Debouncing is based on the time of the interrupt, not of the read
+            device.process(ticks)
+        return count
+
+    def stats(self):
+        return dict(
+            overflows=self.overflows,
+            drained=self.drained,
+            latency_avg=self.latency_total // self.drained if self.drained else 0,
+            latency_max=self.latency_max,
+        )
+
+
 class PCA95XX:
+    """
+    The state of the 16 pins is a bitmask, the first pin of the mapping is bit 15.
+    A pin that changes again within its debounce window after an edge keeps its state until the window has passed,
+    settle() reads the pins again then.
+    """
 
-    ACTIVE = '1'
-    INACTIVE = '0'
-    UP = '1'
-    DOWN = '0'
+    ACTIVE = 1
+    INACTIVE = 0
+    UP = 1
+    DOWN = 0
+    PINS = 16
+    # Input port 0 register, with auto-increment a two byte read returns port 0 and port 1
+    INPUT = 0x00
 
-    def __init__(self, input, i2c, address, mapping=[], interrupt=None, handler=None, wakeup=False):
+    def __init__(self, input, i2c, address, mapping=[], interrupt=None, handler=None, wakeup=False, ring=None,
+                 debounce=0):
+        """
+        :param handler: Called with UP or DOWN, the key code and the time.ticks_us() of the interrupt for every edge
+        :param ring: IRQRing the interrupts are deferred to, without one they are handled in the pin handler
+        :param debounce: Debounce window in ms, either for all pins or a dict of key code -> ms with None as default
+        """
         self.input = input
+        self.ring = ring
         self.i2c = i2c
         self.address = address
         self.mapping = mapping
         self.interrupt = interrupt
         self.handler = handler
-        self.state = self.INACTIVE * 16 # Initialize all buttons as not connected
+        # Initialize all buttons as not connected
+        self.state = (1 << self.PINS) - 1 if self.INACTIVE else 0
         self.wakeup = wakeup
+        # Both input ports, read in one transaction
+        self.buffer = bytearray(2)
+        # Pin masks in mapping order and their key codes, and the reverse for is_pressed
+        self.masks = []
+        self.codes = []
+        self.pins = {}
+        # Debounce windows (us) in mapping order and the time of the last edge of each pin
+        self.windows = []
+        self.edges = []
+        for i in range(min(self.PINS, len(mapping))):
+            mask = 1 << (self.PINS - 1 - i)
+            self.masks.append(mask)
+            self.codes.append(mapping[i])
+            if mapping[i] not in self.pins:
+                self.pins[mapping[i]] = mask
+            window = debounce.get(mapping[i], debounce.get(None, 0)) if type(debounce) is dict else debounce
+            self.windows.append(window * 1000)
+            self.edges.append(0)
+        # Pins that changed within their window and when their windows end
+        self.bouncing = 0
+        self.settle_at = 0
 
     def init(self):
         if self.interrupt:
@@ -62,42 +167,95 @@ class PCA95XX:
             # Fix bug that only registers interrupts after first reset
             self.state = self.read_state()
 
+    def read_ports(self):
+        """
+        Reads both input ports into the buffer
+        :return: The buffer, port 0 followed by port 1
+        """
+        self.i2c.readfrom_mem_into(self.address, self.INPUT, self.buffer)
+        return self.buffer
+
     def read_state(self):
         raise NotImplementedError('How should I read from the IO Expander?')
 
-    def get_events(self):
-        # time.sleep_ms(30)
+    def changes(self):
+        """
+        Reads the pins and updates the state
+        :return: Bitmask of the pins that changed
+        """
         state = self.read_state()
-        changes = []
-        for i in range(min(len(self.state), len(state))):
-            try:
-                if self.state[i] != state[i]:
-                    if state[i] == PCA95XX.UP:
-                        # Button just went up
-                        changes.append((self.input.UP, self.mapping[i]))
-                    elif state[i] == PCA95XX.DOWN:
-                        # Button just went down
-                        changes.append((self.input.DOWN, self.mapping[i]))
-            except IndexError:
-                # If there is no mapping just ignore the key ¯\_(ツ)_/¯
-                pass
+        changed = state ^ self.state
         self.state = state
-        return changes
+        return changed
+
+    def get_events(self):
+        changed = self.changes()
+        events = []
+        for i in range(len(self.masks)):
+            if changed & self.masks[i]:
+                events.append((self.input.UP if self.state & self.masks[i] else self.input.DOWN, self.codes[i]))
+        return events
 
     def is_pressed(self, code):
-        for i, key in enumerate(self.mapping):
-            if key == code:
-                return self.state[i] == self.ACTIVE
-        return False
+        mask = self.pins.get(code, 0)
+        if not mask:
+            return False
+        return (1 if self.state & mask else 0) == self.ACTIVE
 
 
     def _on_input(self, pin):
-        if self.handler:
-            for event in self.get_events():
-                try:
-                    self.handler(*event)
-                except KeyboardInterrupt:
-                    raise
+        if self.ring:
+            self.ring.push(self)
+        else:
+            self.process()
+
+    def process(self, ticks=None):
+        """
+        Reads the pins and calls the handler for every edge outside of the debounce windows
+        :param ticks: time.ticks_us() of the interrupt, now if None
+        """
+        if ticks is None:
+            ticks = time.ticks_us()
+        state = self.read_state()
+        changed = state ^ self.state
+        masks = self.masks
+        windows = self.windows
+        edges = self.edges
+        bouncing = 0
+        # Pins without a mapping are ignored, like those of a shorter mapping
+        for i in range(len(masks)):
+            if windows[i] and changed & masks[i]:
+                elapsed = time.ticks_diff(ticks, edges[i])
+                # Negative if the last edge is older than half the ticks period
+                if 0 <= elapsed < windows[i]:
+                    remaining = windows[i] - elapsed
+                    # The pin is read again once its window has passed
+                    if not bouncing or remaining < time.ticks_diff(self.settle_at, ticks):
+                        self.settle_at = time.ticks_add(ticks, remaining)
+                    bouncing |= masks[i]
+                else:
+                    edges[i] = ticks
+        # Bouncing pins keep their state
+        state ^= bouncing
+        changed ^= bouncing
+        self.state = state
+        self.bouncing = bouncing
+        if not self.handler:
+            return
+        for i in range(len(masks)):
+            if not changed:
+                break
+            if changed & masks[i]:
+                changed ^= masks[i]
+                # Same order as the mapping
+                self.handler(self.input.UP if state & masks[i] else self.input.DOWN, self.codes[i], ticks)
+
+    def settle(self):
+        """
+        Polled by the event loop, reads the pins again after a bounce once its window has passed
+        """
+        if self.bouncing and time.ticks_diff(time.ticks_us(), self.settle_at) >= 0:
+            self.process()
 
     def close(self):
         self.interrupt.irq(handler=None)
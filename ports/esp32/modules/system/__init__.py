@@ -29,9 +29,18 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 from .logger import JSONLogger
+from .heap import Heap
+from .bus import I2CBus
+from .rtcmemory import RTCMemory
+from .profiler import BootProfiler
+from .snapshot import Snapshot
 from .storage import Storage
-from .events import Event, EventLoop
+from .registry import AppRegistry
+from .tasks import Task, sleep_ms, readable, writable, next_event
+from .events import Event, KeyEvent, Timer, EventLoop
+from .worker import Worker
 from .accelerometer import Accelerometer
+from .sequences import SequenceMatcher
 from .input import Input
 from .kernel import Kernel
 from .menu import Menu
@@ -28,7 +28,6 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-from machine import Pin, I2C
 from libs import LIS3DH_I2C
 from libs.lis3dh import RANGE_8_G
 
@@ -36,7 +35,7 @@ from libs.lis3dh import RANGE_8_G
 class Accelerometer:
 
     def __init__(self, kernel):
-        self.i2c = I2C(scl=Pin(5), sda=Pin(4), freq=400000)
+        self.i2c = kernel.i2c
         try:
             self.driver = LIS3DH_I2C(self.i2c, address=0x19)
             self.driver.range = RANGE_8_G
@@ -28,8 +28,6 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-import gc
-
 from system.menu import Menu
 from system import Kernel
 
@@ -37,6 +35,8 @@ from system import Kernel
 class App:
     VERSION = 0
     NAME = None
+    # Bytes the app may keep allocated on top of the heap used when it started, None for no limit
+    HEAP_BUDGET = None
     screens = []
 
     def __init__(self, kernel, screen=0, **kwargs):
@@ -93,12 +93,10 @@ class App:
         try:
             self.screen = self.load(self.initial_screen)
             while self.screen:
-                gc.collect()
                 result = self.screen.run(self)
                 if result is None:
                     result = self.events.keep_listening()
                 while result is Kernel.ACTION_RELOAD:
-                    gc.collect()
                     # self.display.reset()
                     # self.events.clear()
                     # self.screen.register()
@@ -129,10 +127,33 @@ class App:
         if screen < 0 or screen >= len(self.screens):
             raise ValueError("Screen {} does not exist".format(screen))
         self.display.reset()
+        if self.display.policy:
+            # Clean refresh of the new screen instead of ghosts of the old one
+            self.display.policy.request_full()
         self.events.clear()
         self.lights.off()
         return self.screens[screen]
 
+    def suspend(self):
+        """
+        Called when the kernel switches to another app but keeps this one in memory. Override to release resources.
+        """
+        pass
+
+    def resume(self, screen=0, **kwargs):
+        """
+        Called when the kernel switches back to this app instead of instantiating it again
+        :param screen: Screen to start with
+        """
+        self.screen = None
+        self.initial_screen = screen
+        try:
+            # Don't select the entry a previous load asked for again
+            self.screens[self.initial_screen].selected_index = None
+            self.screens[self.initial_screen].init(**kwargs)
+        except IndexError:
+            self.initial_screen = 0
+
     def exit(self, reason=None):
         # Do not call system again if exit was called from system
         if reason is Kernel.REASON_EXIT_SYSTEM:
@@ -0,0 +1,114 @@
+# This file is part of the Troopers 19 Badge project, https://troopers.de/troopers19/
+#
+# The BSD 3-Clause License
+#
+# Copyright (c) 2019 "Malte Heinzelmann" <malte@hnzlmnn.de>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import utime as time
+from machine import Pin, I2C
+
+
+class I2CBus:
+    """
+    The I2C bus shared by the expanders and the accelerometer. Wraps the register transfers of machine.I2C and counts
+    transactions and the time spent on the bus per device address.
+    """
+
+    SCL = 5
+    SDA = 4
+    FREQ = 400000
+
+    def __init__(self, scl=None, sda=None, freq=None):
+        self.i2c = I2C(scl=Pin(scl if scl else self.SCL), sda=Pin(sda if sda else self.SDA),
+                       freq=freq if freq else self.FREQ)
+        # address -> [transactions, us on the bus]
+        self.devices = {}
+        self.transactions = 0
+        self.time = 0
+
+    def _count(self, address, start):
+        us = time.ticks_diff(time.ticks_us(), start)
+        self.transactions += 1
+        self.time += us
+        device = self.devices.get(address)
+        if device is None:
+            device = self.devices[address] = [0, 0]
+        device[0] += 1
+        device[1] += us
+
+    def readfrom_mem_into(self, address, register, buffer):
+        """
+        Reads len(buffer) bytes starting at register without allocating
+        """
+        start = time.ticks_us()
+        try:
+            self.i2c.readfrom_mem_into(address, register, buffer)
+        finally:
+            self._count(address, start)
+
+    def readfrom_mem(self, address, register, length):
+        start = time.ticks_us()
+        try:
+            return self.i2c.readfrom_mem(address, register, length)
+        finally:
+            self._count(address, start)
+
+    def writeto_mem(self, address, register, buffer):
+        start = time.ticks_us()
+        try:
+            self.i2c.writeto_mem(address, register, buffer)
+        finally:
+            self._count(address, start)
+
+    def writeto(self, address, buffer):
+        start = time.ticks_us()
+        try:
+            return self.i2c.writeto(address, buffer)
+        finally:
+            self._count(address, start)
+
+    def readfrom(self, address, length):
+        start = time.ticks_us()
+        try:
+            return self.i2c.readfrom(address, length)
+        finally:
+            self._count(address, start)
+
+    def reset(self):
+        self.devices = {}
+        self.transactions = 0
+        self.time = 0
+
+    def report(self):
+        """
+        Prints transactions and bus time per device address to the REPL
+        """
+        print("{:<8} {:>8} {:>8}".format('address', 'count', 'ms'))
+        for address in sorted(self.devices):
+            count, us = self.devices[address]
+            print("{:<8} {:>8} {:>8.1f}".format(hex(address), count, us / 1000))
+        print("{:<8} {:>8} {:>8.1f}".format('total', self.transactions, self.time / 1000))
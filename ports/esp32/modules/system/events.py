@@ -28,23 +28,28 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-import machine
+import _thread
+import sys
 import time
+import uio
+import uselect
+import utimeq
+
+from system.tasks import Awaitable, CancelledError, Task
 
 
 class Event:
 
     def __init__(self, name, sender=None, data={}):
         if isinstance(name, str):
-            name = EventLoop.keypath(name)
-        self.path = name
+            self.name = name
+            self.path = EventLoop.keypath(name)
+        else:
+            self.name = '.'.join(name)
+            self.path = tuple(name)
         self.sender = sender
         self.data = data
 
-    @property
-    def name(self):
-        return '.'.join(self.path)
-
     def __getattr__(self, item):
         return self.data.get(item, None)
 
@@ -52,29 +57,129 @@ class Event:
         return 'Event {} {}'.format(self.name, self.data)
 
 
+class KeyEvent(Event):
+    """
+    A key transition with fixed fields instead of a data dict. Input keeps one per key and direction and updates it
+    for every transition, so listeners must not hold on to it.
+    """
+
+    def __init__(self, name, code, type):
+        super().__init__(name)
+        self.type = type
+        self.code = code
+        self.key = None
+        self.ctrl = False
+        self.shift = False
+        self.shield = False
+        # Repeats so far, or in total for a key up
+        self.count = 0
+
+    def __str__(self):
+        return 'Event {} {}'.format(self.name, dict(type=self.type, code=self.code, key=self.key, count=self.count))
+
+
+class Timer:
+    """
+    A callback run by the event loop at a deadline, see EventLoop.call_later() and call_every()
+    """
+
+    def __init__(self, callback, args=(), interval=None, persistent=False):
+        """
+        :param interval: ms between runs of a periodic timer, None to run once
+        :param persistent: Keep the timer when the loop is cleared for the next app
+        """
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.persistent = persistent
+        # time.ticks_ms() it runs at, None if it isn't scheduled
+        self.due = None
+        self.generation = 0
+
+
+class Waker(uio.IOBase):
+    """
+    Readable while the event loop is woken, so that polling it with the streams of the tasks ends the wait on wake()
+    """
+
+    # MP_STREAM_POLL
+    POLL = 3
+
+    def __init__(self, loop):
+        self.loop = loop
+
+    def ioctl(self, request, arg):
+        if request == self.POLL:
+            return arg & uselect.POLLIN if self.loop.woken else 0
+        # Not a file, the poll of the unix port refuses it
+        return -22
+
+
 class EventLoop:
     SIMULATE = None
 
-    def __init__(self):
+    # Event name -> interned keypath
+    PATHS = {}
+    # Capacity of the timer queue
+    TIMERS = 32
+    # Longest sleep (ms) while waiting without a timer due, and the steps it sleeps in to notice wake() where the
+    # waker can't be polled
+    IDLE_MAX = 100
+    IDLE_SLICE = 10
+
+    def __init__(self, idle=None):
+        """
+        :param idle: Called with the ms since the last event while waiting for events
+        """
+        self.idle = idle
+        self.last = time.ticks_ms()
         self.listeners = {}
+        # Keypath -> listeners of the path and its parents, rebuilt after on() and clear()
+        self.routes = {}
         self.listener_count = 0
         self.listener_count_base = 0
         self.result = None
+        # Called while the loop waits, e.g. to handle deferred interrupts
+        self.pollers = []
+        # Events posted by other threads, emitted by the thread running the loop
+        self.pending = []
+        self._lock = _thread.allocate_lock()
+        # Timers by due time. Cancelled and rescheduled timers stay queued until they are due and are skipped then.
+        self.timers = utimeq.utimeq(self.TIMERS)
+        self.timer = [0, 0, 0]
+        # Incremented by clear(), timers of an older generation that aren't persistent are dropped
+        self.generation = 0
+        # Set by wake() to end wait() early
+        self.woken = False
+        # Tasks to resume with (task, value, error)
+        self.ready = []
+        # Tasks that haven't finished
+        self.tasks = set()
+        # Streams tasks wait for, id(stream) -> [stream, mask, reader, writer]
+        self.io = {}
+        self.poller = uselect.poll()
+        self.waker = Waker(self)
+        try:
+            self.poller.register(self.waker, uselect.POLLIN)
+        except TypeError:
+            self.waker = None
 
     def finish_base(self):
         self.listener_count_base = self.listener_count
 
     @staticmethod
     def keypath(key):
-        while key.find('..') >= 0:
-            key = key.replace('..', '.')
-        return key.strip('.').split('.')
+        path = EventLoop.PATHS.get(key, None)
+        if path is None:
+            path = tuple(part for part in key.split('.') if part)
+            EventLoop.PATHS[key] = path
+        return path
 
     def get(self, path, parents=False):
         if isinstance(path, str):
             path = EventLoop.keypath(path)
-        if not isinstance(path, list):
-            raise ValueError("Must provide a list a keypath (see EventLoop.keypath()).")
+        if not isinstance(path, (tuple, list)):
+            raise ValueError("Must provide a keypath (see EventLoop.keypath()).")
         listeners = self.listeners
         all_listeners = []
         for key in path:
@@ -97,7 +202,48 @@ class EventLoop:
         self.listener_count += 1
         listeners = self.get(name)
         listeners.setdefault('_', [])
-        listeners['_'].append((listener, single))
+        # Listener, single shot, only takes the event (see emit)
+        listeners['_'].append([listener, single, False])
+        self.routes = {}
+
+    def listen(self, task, name, listener):
+        """
+        Registers a single shot listener that resumes a waiting task. clear() cancels the task or registers the
+        listener again if the task is persistent.
+        """
+        def resume(event):
+            task.listening = None
+            return listener(event)
+        self.on(name, resume, single=True)
+        task.listening = (name, resume)
+
+    def route(self, path):
+        """
+        :param path: Keypath of an event
+        :return: The listeners of the path and its parents, compiled on first use
+        """
+        listeners = self.routes.get(path, None)
+        if listeners is None:
+            listeners = self.get(path, True)
+            self.routes[path] = listeners
+        return listeners
+
+    def off(self, listener, single=True):
+        """
+        Removes a listener from the tree
+        :param single: Only remove single shot registrations
+        """
+        nodes = [self.listeners]
+        while nodes:
+            node = nodes.pop()
+            for key in node:
+                if key != '_':
+                    nodes.append(node[key])
+                    continue
+                for entry in [entry for entry in node[key] if entry[0] is listener and (entry[1] or not single)]:
+                    node[key].remove(entry)
+                    self.listener_count -= 1
+        self.routes = {}
 
     def emit(self, event):
         if event is None:
@@ -106,31 +252,342 @@ class EventLoop:
             raise ValueError("Only events can be emitted.")
         if self.result is not None:
             return self.result
-        listeners = self.get(event.path, True)
-        for i, (listener, single) in enumerate(listeners):
-            try:
-                result = listener(event, self)
-            except TypeError:
+        self.last = time.ticks_ms()
+        for entry in self.route(event.path):
+            listener = entry[0]
+            if entry[2]:
                 result = listener(event)
-            if single:
-                self.listener_count -= 1
-                listeners.pop(i)
+            else:
+                try:
+                    result = listener(event, self)
+                except TypeError:
+                    result = listener(event)
+                    # Don't raise (and allocate) the TypeError again for the next event
+                    entry[2] = True
+            if entry[1]:
+                self.off(listener)
             if result is not None:
                 self.result = result
                 break
         return self.result
 
+    def post(self, event):
+        """
+        Queues an event, it is emitted after the pollers while the loop waits for a result. Safe from other threads.
+        """
+        with self._lock:
+            self.pending.append(event)
+        self.woken = True
+
+    def call_later(self, delay, callback, *args, persistent=False):
+        """
+        Runs callback(*args) once after delay ms. A result other than None ends the loop like that of a listener.
+        :param persistent: Keep the timer when the loop is cleared for the next app
+        :return: The Timer, to cancel it
+        """
+        timer = Timer(callback, args, persistent=persistent)
+        if not self.start(timer, delay):
+            raise IndexError('Too many timers')
+        return timer
+
+    def call_every(self, interval, callback, *args, persistent=False):
+        """
+        Runs callback(*args) every interval ms until it is cancelled. Runs missed while the loop was busy are skipped.
+        :return: The Timer, to cancel it
+        """
+        timer = Timer(callback, args, interval, persistent)
+        if not self.start(timer, interval):
+            raise IndexError('Too many timers')
+        return timer
+
+    def start(self, timer, delay):
+        """
+        (Re)schedules a timer delay ms from now
+        """
+        return self.schedule(timer, time.ticks_add(time.ticks_ms(), delay))
+
+    def schedule(self, timer, due):
+        """
+        (Re)schedules a timer at a time.ticks_ms() value, an earlier schedule of the timer is replaced
+        :return: False if the queue is full, the timer isn't scheduled then
+        """
+        if len(self.timers) >= self.TIMERS:
+            self.purge()
+        if len(self.timers) >= self.TIMERS:
+            timer.due = None
+            return False
+        timer.due = due
+        timer.generation = self.generation
+        self.timers.push(due, timer, None)
+        self.woken = True
+        return True
+
+    def cancel(self, timer):
+        timer.due = None
+
+    def purge(self):
+        """
+        Drops the entries of cancelled and rescheduled timers and of timers from before the last clear() from the queue
+        """
+        timers = self.timers
+        entry = self.timer
+        keep = []
+        while timers:
+            timers.pop(entry)
+            timer = entry[1]
+            if timer.due == entry[0] and (timer.persistent or timer.generation == self.generation):
+                if timer not in keep:
+                    keep.append(timer)
+            elif timer.due == entry[0]:
+                timer.due = None
+        entry[1] = None
+        for timer in keep:
+            timers.push(timer.due, timer, None)
+
+    def run_timers(self):
+        """
+        Runs the timers that are due
+        """
+        timers = self.timers
+        entry = self.timer
+        now = time.ticks_ms()
+        while timers and self.result is None and time.ticks_diff(timers.peektime(), now) <= 0:
+            timers.pop(entry)
+            due = entry[0]
+            timer = entry[1]
+            entry[1] = None
+            if timer.due != due:
+                continue
+            if not timer.persistent and timer.generation != self.generation:
+                timer.due = None
+                continue
+            if timer.interval:
+                due = time.ticks_add(due, timer.interval)
+                if time.ticks_diff(due, now) <= 0:
+                    due = time.ticks_add(now, timer.interval)
+                self.schedule(timer, due)
+            else:
+                timer.due = None
+            result = timer.callback(*timer.args) if timer.args else timer.callback()
+            if result is not None:
+                self.result = result
+
+    def next_timer(self):
+        """
+        :return: ms until the next timer is due, None without timers
+        """
+        if not self.timers:
+            return None
+        return max(0, time.ticks_diff(self.timers.peektime(), time.ticks_ms()))
+
+    def create_task(self, coro, persistent=False):
+        """
+        Runs a coroutine on the loop. It runs while the loop waits for events and may await sleep_ms(), readable(),
+        writable(), next_event(), Worker.call() or other tasks from system.tasks.
+        :param persistent: Keep running when the loop is cleared for the next app, for kernel services
+        :return: The Task, awaitable and cancellable
+        """
+        task = Task(self, coro, persistent)
+        self.tasks.add(task)
+        self.resume(task)
+        return task
+
+    def resume(self, task, value=None, error=None):
+        """
+        Continues a task with the value of its await expression, or raises error in it
+        """
+        self.ready.append((task, value, error))
+        self.woken = True
+
+    def step(self, task, value=None, error=None):
+        if task.done:
+            return
+        task.listening = None
+        try:
+            if error is not None:
+                awaited = task.coro.throw(error)
+            else:
+                awaited = task.coro.send(value)
+        except StopIteration as e:
+            self.finish(task, e.value, None)
+            return
+        except Exception as e:
+            self.finish(task, None, e)
+            return
+        if awaited is None:
+            # A bare yield just lets the other tasks run
+            self.resume(task)
+        elif isinstance(awaited, Awaitable):
+            awaited.wait(self, task)
+        else:
+            self.resume(task, error=TypeError("Can't await {}".format(type(awaited).__name__)))
+
+    def finish(self, task, result, error):
+        task.done = True
+        task.result = result
+        task.error = error
+        self.tasks.discard(task)
+        if task.listening is not None:
+            self.off(task.listening[1])
+            task.listening = None
+        if self.io:
+            self.remove_io(task)
+        if error is not None and not task.waiters and not isinstance(error, CancelledError):
+            sys.print_exception(error)
+        for waiter in task.waiters:
+            self.resume(waiter, result, error)
+        task.waiters = []
+
+    def run_tasks(self):
+        """
+        Resumes the tasks that became ready before this call
+        """
+        ready = self.ready
+        self.ready = []
+        for i in range(len(ready)):
+            if self.result is not None:
+                # Continued with the next dispatch
+                self.ready = ready[i:] + self.ready
+                break
+            task, value, error = ready[i]
+            self.step(task, value, error)
+
+    def add_io(self, stream, mask, task):
+        entry = self.io.get(id(stream), None)
+        if entry is None:
+            entry = self.io[id(stream)] = [stream, 0, None, None]
+            self.poller.register(stream, mask)
+        entry[1] |= mask
+        entry[2 if mask == uselect.POLLIN else 3] = task
+        self.poller.modify(stream, entry[1])
+
+    def remove_io(self, task):
+        """
+        Stops waiting for the streams of a finished task
+        """
+        for entry in list(self.io.values()):
+            if entry[2] is task:
+                entry[2] = None
+                entry[1] &= ~uselect.POLLIN
+            if entry[3] is task:
+                entry[3] = None
+                entry[1] &= ~uselect.POLLOUT
+            self.update_io(entry)
+
+    def update_io(self, entry):
+        if entry[1]:
+            self.poller.modify(entry[0], entry[1])
+        else:
+            self.poller.unregister(entry[0])
+            del self.io[id(entry[0])]
+
+    def poll_io(self, timeout=0):
+        """
+        Resumes the tasks whose streams are ready
+        :param timeout: ms to wait for a stream
+        """
+        for stream, flags in self.poller.ipoll(timeout):
+            if stream is self.waker:
+                continue
+            entry = self.io[id(stream)]
+            # Errors and hang ups resume both so that the tasks see them when they read or write
+            if flags & ~uselect.POLLOUT and entry[2] is not None:
+                self.resume(entry[2])
+                entry[2] = None
+                entry[1] &= ~uselect.POLLIN
+            if flags & ~uselect.POLLIN and entry[3] is not None:
+                self.resume(entry[3])
+                entry[3] = None
+                entry[1] &= ~uselect.POLLOUT
+            self.update_io(entry)
+
+    def wake(self):
+        """
+        Ends wait() early, e.g. after an interrupt. Safe from interrupt handlers and other threads.
+        """
+        self.woken = True
+
+    def wait(self):
+        """
+        Sleeps until the next timer is due, wake() is called or IDLE_MAX ms have passed
+        """
+        timeout = self.next_timer()
+        if timeout is None or timeout > self.IDLE_MAX:
+            timeout = self.IDLE_MAX
+        if self.waker is not None:
+            if not self.woken:
+                # Returns early if the waker or a stream becomes ready
+                self.poll_io(timeout)
+            self.woken = False
+            return
+        start = time.ticks_ms()
+        while not self.woken:
+            remaining = timeout - time.ticks_diff(time.ticks_ms(), start)
+            if remaining <= 0:
+                break
+            if self.io:
+                # Returns early if a stream becomes ready
+                self.poll_io(min(remaining, self.IDLE_SLICE))
+            else:
+                time.sleep_ms(min(remaining, self.IDLE_SLICE))
+        self.woken = False
+
+    def dispatch(self):
+        """
+        Runs the pollers, the timers that are due and the tasks that are ready and emits the events posted by other
+        threads
+        """
+        for poller in self.pollers:
+            if self.result is not None:
+                break
+            poller()
+        if self.timers and self.result is None:
+            self.run_timers()
+        if self.io and self.result is None:
+            self.poll_io()
+        if self.ready and self.result is None:
+            self.run_tasks()
+        while self.pending and self.result is None:
+            with self._lock:
+                event = self.pending.pop(0)
+            self.emit(event)
+        return self.result
+
     def clear(self):
+        """
+        Removes the listeners, timers and tasks of the app, the persistent ones keep running
+        """
+        self.generation += 1
+        for task in [task for task in self.tasks if not task.persistent]:
+            task.cancel()
+        self.purge()
         self.listeners = {}
+        self.routes = {}
         self.listener_count = 0
         self.listener_count_base = 0
         self.result = None
+        for task in self.tasks:
+            if task.listening is not None:
+                self.on(task.listening[0], task.listening[1], single=True)
 
     def active(self):
         return self.listener_count > self.listener_count_base
 
+    def busy(self):
+        """
+        :return: True while listeners or tasks that aren't persistent are left. Persistent tasks only run alongside
+        them, a kernel service alone doesn't keep keep_listening() going.
+        """
+        count = self.listener_count - self.listener_count_base
+        for task in self.tasks:
+            if not task.persistent:
+                return True
+            if task.listening is not None:
+                count -= 1
+        return count > 0
+
     def has_result(self):
-        if self.result is not None:
+        if self.dispatch() is not None:
             return self.result
         if self.SIMULATE:
             time.sleep(2)
@@ -138,11 +595,38 @@ class EventLoop:
 
     def keep_listening(self):
         try:
-            while self.active() and self.result is None:
-                machine.idle()
+            while self.busy() and self.dispatch() is None:
+                if self.idle:
+                    self.idle(time.ticks_diff(time.ticks_ms(), self.last))
+                self.wait()
                 if self.SIMULATE:
                     time.sleep(2)
                     self.result = self.SIMULATE(self)
             return self.result
         except KeyboardInterrupt:
             raise
+
+
+def benchmark(counts=(1, 4, 16, 64), runs=200):
+    """
+    Prints the cost of an emit against the number of listeners, with compiled routes and with routes rebuilt
+    for every event as before they were cached
+    :param counts: Numbers of listeners on the emitted path and its parents
+    :param runs: Events emitted per measurement
+    """
+    print("{:>9} {:>10} {:>10}".format('listeners', 'cached us', 'walked us'))
+    for count in counts:
+        loop = EventLoop()
+        paths = ('input', 'input.up', 'input.up.a')
+        for i in range(count):
+            loop.on(paths[i % len(paths)], lambda event, loop: None)
+        event = Event('input.up.a')
+        times = []
+        for cached in (True, False):
+            start = time.ticks_us()
+            for i in range(runs):
+                if not cached:
+                    loop.routes = {}
+                loop.emit(event)
+            times.append(time.ticks_diff(time.ticks_us(), start) / runs)
+        print("{:>9} {:>10.1f} {:>10.1f}".format(count, times[0], times[1]))
@@ -0,0 +1,116 @@
+# This file is part of the Troopers 19 Badge project, https://troopers.de/troopers19/
+#
+# The BSD 3-Clause License
+#
+# Copyright (c) 2019 "Malte Heinzelmann" <malte@hnzlmnn.de>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import gc
+import utime as time
+
+
+class Heap:
+    """
+    Central garbage collection policy. gc.threshold() lets the allocator collect on its own before the heap runs out,
+    everything else collects at idle points or app switches but never while an event is handled.
+    """
+
+    # Fraction of the heap allocated between automatic collections
+    THRESHOLD = 4
+    # The event loop has to be quiet for this long (ms) before an idle collection
+    IDLE_DELAY = 250
+    # Bytes allocated since the last collection that make an idle collection worthwhile
+    IDLE_GROWTH = 8 * 1024
+
+    def __init__(self, kernel, threshold=None):
+        """
+        :param kernel: The kernel
+        :param threshold: Bytes allocated between automatic collections, a fraction of the heap if None
+        """
+        self.kernel = kernel
+        if threshold is None:
+            threshold = (gc.mem_free() + gc.mem_alloc()) // self.THRESHOLD
+        self.threshold = threshold
+        gc.threshold(threshold)
+        # Collections and time spent in them (us) by reason
+        self.collections = {}
+        self.time = {}
+        self.alloc = gc.mem_alloc()
+        self.checked = time.ticks_ms()
+        self.app = None
+        self.budget = None
+        self.baseline = 0
+        self.exceeded = False
+
+    def collect(self, reason='forced'):
+        """
+        Collects and records how long it took
+        :param reason: Counted separately in the report
+        """
+        start = time.ticks_us()
+        gc.collect()
+        self.time[reason] = self.time.get(reason, 0) + time.ticks_diff(time.ticks_us(), start)
+        self.collections[reason] = self.collections.get(reason, 0) + 1
+        self.alloc = gc.mem_alloc()
+
+    def start(self, app, budget=None):
+        """
+        Called after switching apps, allocations above the current heap usage count against the budget of the app
+        :param app: Name of the app
+        :param budget: Bytes the app may keep allocated, None for no limit
+        """
+        self.app = app
+        self.budget = budget
+        self.baseline = gc.mem_alloc()
+        self.exceeded = False
+
+    def idle(self, quiet):
+        """
+        Called by the event loop while it waits for events
+        :param quiet: ms since the last event
+        """
+        now = time.ticks_ms()
+        if quiet < self.IDLE_DELAY or time.ticks_diff(now, self.checked) < self.IDLE_DELAY:
+            return
+        self.checked = now
+        alloc = gc.mem_alloc()
+        over = self.budget is not None and alloc - self.baseline > self.budget
+        # Apps over their budget are collected more eagerly
+        if alloc - self.alloc <= (self.IDLE_GROWTH // 8 if over else self.IDLE_GROWTH):
+            return
+        self.collect('budget' if over else 'idle')
+        if over and not self.exceeded and self.alloc - self.baseline > self.budget:
+            self.exceeded = True
+            self.kernel.logger.warning("App '{}' exceeds its heap budget".format(self.app))
+
+    def report(self):
+        """
+        Prints the collections by reason to the REPL. Automatic collections (gc.threshold) aren't counted.
+        """
+        print("{:<8} {:>6} {:>8}".format('reason', 'count', 'ms'))
+        for reason in sorted(self.collections):
+            print("{:<8} {:>6} {:>8.1f}".format(reason, self.collections[reason], self.time[reason] / 1000))
+        print("free {} allocated {} threshold {}".format(gc.mem_free(), gc.mem_alloc(), self.threshold))
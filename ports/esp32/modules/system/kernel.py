@@ -37,7 +37,7 @@ import ubinascii as binascii
 import utime as time
 import display
 
-from system import EventLoop, Storage, Input, Accelerometer
+from system import Heap, I2CBus, Event, EventLoop, Storage, Input, Accelerometer, BootProfiler, Snapshot, AppRegistry, Worker
 from libs import Display, HTTP, TarFile, DIRTYPE, REGTYPE, rmtree, ensure, Light
 
 
@@ -70,9 +70,32 @@ class Kernel:
 
     RTC = machine.RTC()
 
-    def __init__(self, logger):
+    # Number of suspended apps kept in memory and the free heap in bytes below which the oldest ones are dropped
+    APP_CACHE_SIZE = 3
+    APP_CACHE_WATERMARK = 24 * 1024
+
+    def __init__(self, logger, profiler=None, connect=False, snapshot=None):
+        """
+        :param logger: The system logger
+        :param profiler: BootProfiler recording this boot
+        :param connect: Start to associate with the WiFi in the background
+        :param snapshot: State saved by sleep(). Resumes warm and skips everything the resumed app doesn't need.
+        """
+        # Lazily constructed subsystems, see accel, lights and http
+        self._accel = None
+        self._lights = None
+        self._http = None
+        # name -> (init time in us, bytes allocated during init)
+        self.subsystems = {}
+        self.snapshot = snapshot
+        self.profiler = profiler if profiler else BootProfiler()
+        self.profiler.begin('kernel')
+        self.heap = Heap(self)
         self.reason = self.START_NORMAL
         self.wifi_connection = network.WLAN(network.STA_IF)
+        self.wifi_started = None
+        # (SSID, PSK) of the last association, to notice when the settings change
+        self.wifi_credentials = None
         try:
             os.mkdir("apps/")
         except:
@@ -83,13 +106,12 @@ class Kernel:
         self.client = None
         self.app = None
         self.task = None
+        # Suspended (app, task) pairs, least recently used first
+        self.cache = []
+        self.app_cache_size = self.APP_CACHE_SIZE
+        self.app_cache_watermark = self.APP_CACHE_WATERMARK
         self.logger = logger
-        self.display = Display()
-        self.events = EventLoop()
-        self.lights = Light()
-        self.input = Input(self)
-        self.accel = Accelerometer(self)
-        self.storage = Storage(self, 'config.json', dict(
+        self.storage = self.profiler.measure('storage', Storage, self, 'config.json', dict(
             SSID="trp-badge",
             PSK="5EILZYY-kAGxzLhFrLjln3ThO6qLUd",
             OTA=True,
@@ -97,15 +119,82 @@ class Kernel:
             RESTART=False,
             NAME=None,
             CERT='MIIFWjCCBEKgAwIBAgISA9L5Owq6Upc+NcvoCeynwoT0MA0GCSqGSIb3DQEBCwUAMEoxCzAJBgNVBAYTAlVTMRYwFAYDVQQKEw1MZXQncyBFbmNyeXB0MSMwIQYDVQQDExpMZXQncyBFbmNyeXB0IEF1dGhvcml0eSBYMzAeFw0xOTAzMDYwODA5NTVaFw0xOTA2MDQwODA5NTVaMBwxGjAYBgNVBAMTEWJhZGdlLnRyb29wZXJzLmRlMIIBIjANBgkqhkiG9w0BAQEFAAOCAQ8AMIIBCgKCAQEAvNvI/t5eu6G/lkWTAsAXq8PeJAAg/K9gPH9EJTv2h321NvqPIu5qHD1c9GXL77AgNh8q3H6kDAKrLwnucRVXPEkG9tjd/OJ+UrTrxgIVvEdpXszpNg4p5KYFZ3XD6u5bXmUIX8luFfW5mU6Iq3kqFZj3Zeo0vakV9eUWsEV/sFd75A68on/Y84Sr8TIEyqF0qd4GC22bHkcmhJp6iWixiC6J6nW4B7c/9EvtAUZY4kguVL1Oofck197bQMHtGQ70/CeUtBsVIE7BdErCxXFD7tJjWTCTC1WujNUx/JXx21IzuxedAN1YcnnOCXZRWgysbFBIG+kcUsZCmU3LpBT96wIDAQABo4ICZjCCAmIwDgYDVR0PAQH/BAQDAgWgMB0GA1UdJQQWMBQGCCsGAQUFBwMBBggrBgEFBQcDAjAMBgNVHRMBAf8EAjAAMB0GA1UdDgQWBBSlLdWBLw0Wp4RxN2A33VmwScN70zAfBgNVHSMEGDAWgBSoSmpjBH3duubRObemRWXv86jsoTBvBggrBgEFBQcBAQRjMGEwLgYIKwYBBQUHMAGGImh0dHA6Ly9vY3NwLmludC14My5sZXRzZW5jcnlwdC5vcmcwLwYIKwYBBQUHMAKGI2h0dHA6Ly9jZXJ0LmludC14My5sZXRzZW5jcnlwdC5vcmcvMBwGA1UdEQQVMBOCEWJhZGdlLnRyb29wZXJzLmRlMEwGA1UdIARFMEMwCAYGZ4EMAQIBMDcGCysGAQQBgt8TAQEBMCgwJgYIKwYBBQUHAgEWGmh0dHA6Ly9jcHMubGV0c2VuY3J5cHQub3JnMIIBBAYKKwYBBAHWeQIEAgSB9QSB8gDwAHcAdH7agzGtMxCRIZzOJU9CcMK//V5CIAjGNzV55hB7zFYAAAFpUkQy9AAABAMASDBGAiEAu5gK0sMgJZO89ckeIbLRWqpGwnqrw1VrJDi+7RCwcfECIQC7BlUjBvqGnCHXsPvJ6Kbn36FM7jB6n5jFN43JuljeqgB1AGPy283oO8wszwtyhCdXazOkjWF3j711pjixx2hUS9iNAAABaVJEMzwAAAQDAEYwRAIgNDGWmYMu8LCLizzPvyaqY3esHD8kAQEb+8s6SeRP5MACIFAVCGA8MqITaiklniVi02qPYMN7C133K92NeyV9fs7+MA0GCSqGSIb3DQEBCwUAA4IBAQBDhPs8li57LHsMm1heI96Z9D/7lYgco2n7XGk/JWbiQ2AKa+guyExu6OTKci7D3+EnyAF9R4rVnR4O6g8vpBjoIrqXMODvveX5rAMOGJ+hOerA7EbpMnShhHsWe5FGlAdfqZ7K0220WNQlWBFkGHaH2lViO6f3Dgp2WEX8NhLwDrLWfJaYcPQin/3qJn3HDoCySY6NsJyaSldX6OCMDCPp9JhiRrfp/kaoMgti+2x9QUaRJLJsoLSXJ0bIwt5xM0z48H+vsrT6CZVyq345ZcFOFlkgl0ptWATkUFhbH6xuvUtcoTldbKH2tVpKauK40PzEW1hew/wPIXzc9FEqh9+3',
-        ))
-        self.http = HTTP(self, self.storage.OTA_SERVER, self.id())
-        self.registration()
-        try:
-            import apps.main
-            apps.main.MenuScreen.app_infos(self)
-        except:
-            pass
-        gc.collect()
+        ), hot=snapshot.get('storage', None) if snapshot else None)
+        # Loaded on first use
+        self.registry = AppRegistry(self)
+        # Associate in the background while the local subsystems are set up, wifi() is the join point
+        if connect:
+            self.wifi_begin()
+        self.display = self.profiler.measure('display', Display)
+        self.events = EventLoop(self.heap.idle)
+        # Emitted when a refresh started by display.update(wait=False) finished
+        self.display_done = Event('display.done', self.display)
+        self.display.wake = self.events.wake
+        self.events.pollers.append(self.poll_display)
+        # Network jobs, the thread starts with the first one
+        self.worker = Worker(self)
+        # Shared by the expanders and the accelerometer
+        self.i2c = I2CBus()
+        self.input = self.profiler.measure('input', Input, self)
+        if snapshot:
+            self.display.rotation(snapshot.get('rotation', Display.default_rotation))
+            self.display.font(snapshot.get('font', Display.default_font))
+            self.display.inverted(snapshot.get('inverted', Display.default_inverted))
+            self.registration()
+        else:
+            self.profiler.measure('registration', self.registration)
+        self.heap.collect('boot')
+        self.profiler.end('kernel')
+
+    @property
+    def accel(self):
+        if self._accel is None:
+            self._accel = self._subsystem('accel', Accelerometer, self)
+        return self._accel
+
+    @property
+    def lights(self):
+        if self._lights is None:
+            self._lights = self._subsystem('lights', Light)
+        return self._lights
+
+    @property
+    def http(self):
+        if self._http is None:
+            # Receives the registration key if there already is one
+            self._http = self._subsystem('http', HTTP, self, self.storage.OTA_SERVER, self.id(), self.secret)
+        return self._http
+
+    def _subsystem(self, name, factory, *args):
+        """
+        Constructs a subsystem on first access and records how long that took and how much heap it allocated
+        :param name: Name of the subsystem, also the profiler stage
+        :param factory: Callable constructing the subsystem
+        :return: The subsystem
+        """
+        alloc = gc.mem_alloc()
+        start = time.ticks_us()
+        subsystem = self.profiler.measure(name, factory, *args)
+        # The allocation includes garbage created during init and may be negative if a collection ran
+        self.subsystems[name] = (time.ticks_diff(time.ticks_us(), start), gc.mem_alloc() - alloc)
+        return subsystem
+
+    def subsystem_report(self):
+        """
+        Prints init time and heap allocation of the lazily constructed subsystems to the REPL
+        """
+        print("{:<8} {:>8} {:>8}".format('system', 'ms', 'bytes'))
+        for name in ('accel', 'lights', 'http'):
+            if name in self.subsystems:
+                us, alloc = self.subsystems[name]
+                print("{:<8} {:>8.1f} {:>8}".format(name, us / 1000, alloc))
+            else:
+                print("{:<8} {:>8} {:>8}".format(name, '-', '-'))
+
+    def poll_display(self):
+        if self.display.refreshed:
+            self.display.refreshed = False
+            self.events.emit(self.display_done)
 
     def safe_reset(self):
         # if machine.reset_cause() is not machine.SOFT_RESET:
@@ -116,28 +205,51 @@ class Kernel:
             return
         machine.reset()
 
+    def wifi_begin(self, timeout=None):
+        """
+        Starts to associate with the configured network without waiting for the connection. A connection or
+        association with other credentials than the configured ones is replaced.
+        :param timeout: Start an association again that has been running for longer than timeout ms
+        :return: True if an association was started
+        """
+        if not self.storage.SSID or not self.storage.PSK:
+            return False
+        credentials = (self.storage.SSID, self.storage.PSK)
+        if self.wifi_current():
+            return False
+        if self.wifi_started is not None and self.wifi_credentials == credentials and (
+                not timeout or time.ticks_diff(time.ticks_ms(), self.wifi_started) < timeout):
+            return False
+        if self.wifi_started is not None or self.wifi_connected():
+            self.wifi_connection.disconnect()
+        self.wifi_connection = network.WLAN(network.STA_IF)
+        if not self.wifi_connection.active():
+            self.wifi_connection.active(True)
+        self.wifi_connection.connect(*credentials)
+        self.wifi_credentials = credentials
+        self.wifi_started = time.ticks_ms()
+        return True
+
     def wifi(self, timeout=None):
         """
-        Tries to connect to wifi
-        :param timeout: Timeout in ms
+        Tries to connect to wifi. If an association was already started by wifi_begin() this waits for it.
+        :param timeout: Timeout in ms, counted from the start of the association
         :return: True if connected, False if no connection could be established
         """
-        if self.wifi_connected():
+        if self.wifi_current():
+            self.wifi_started = None
             return True
         if self.storage.SSID and self.storage.PSK:
-            self.display.text("Connecting to WiFi...", 0, line=0, update=True)
-            self.wifi_connection = network.WLAN(network.STA_IF)
-            if not self.wifi_connection.active():
-                self.wifi_connection.active(True)
-            if not self.wifi_connection.isconnected():
-                self.wifi_connection.connect(self.storage.SSID, self.storage.PSK)
-                if not timeout:
-                    while not self.wifi_connection.isconnected():
-                        machine.idle()
-                else:
-                    start = time.ticks_ms()
-                    while not self.wifi_connection.isconnected() and time.ticks_ms() - start < timeout:
-                        machine.idle()
+            if not self.worker.current():
+                self.display.text("Connecting to WiFi...", 0, line=0, update=True)
+            # An association that already ran out of time or used old settings starts over
+            self.wifi_begin(timeout)
+            if not timeout:
+                while not self.wifi_connection.isconnected():
+                    machine.idle()
+            else:
+                while not self.wifi_connection.isconnected() and time.ticks_diff(time.ticks_ms(), self.wifi_started) < timeout:
+                    machine.idle()
             if not self.wifi_connection.isconnected():
                 self.wifi_off()
                 self.logger.error("WiFi connection could not be established!")
@@ -146,22 +258,31 @@ class Kernel:
             self.wifi_off()
             self.logger.error("No WiFi configuration available!")
             return False
+        self.wifi_started = None
         return True
 
     def wifi_off(self):
+        self.wifi_started = None
         if self.wifi_connection and self.wifi_connection.active():
             self.wifi_connection.active(False)
 
     def wifi_connected(self):
         return self.wifi_connection and self.wifi_connection.isconnected()
 
+    def wifi_current(self):
+        """
+        :return: True if connected with the configured credentials, or with unknown ones as after a soft reset
+        """
+        return self.wifi_connected() and self.wifi_credentials in (None, (self.storage.SSID, self.storage.PSK))
+
     def ensure_registration(self):
         if not self.registration():
             ret = self.register()
             if ret > 0:
                 return ret + 1
         if not self.registration():
-            self.display.text("No registration!", 0, line=1, update=True)
+            if not self.worker.current():
+                self.display.text("No registration!", 0, line=1, update=True)
             self.logger.error("Device misses registration!")
             return 1
         return 0
@@ -172,7 +293,11 @@ class Kernel:
         self.reason = reason
         try:
             if reason is self.START_SLEEP:
-                self.load(self.MENU_APP)
+                if self.snapshot:
+                    self.load(self.snapshot['app'], self.snapshot.get('screen', 0),
+                              menu_index=self.snapshot.get('menu_index', None))
+                else:
+                    self.load(self.MENU_APP)
             else:
                 self.lights.off()
                 print('Starting!', reason)
@@ -228,28 +353,49 @@ class Kernel:
         return self.ACTION_EXIT, None
 
     def load(self, app=None, screen=0, **kwargs):
+        if self.profiler.saved:
+            return self._load(app, screen, **kwargs)
+        # The first app load finishes the boot profile
+        try:
+            return self.profiler.measure('app_load', self._load, app, screen, **kwargs)
+        finally:
+            self.profiler.save()
+
+    def _load(self, app=None, screen=0, **kwargs):
         if not app:
             app = self.DEFAULT_APP
         if self.app == app:
             return self.task
-        try:
-            exec("import apps.{}".format(app), {})
-        except (ImportError, AttributeError, IndentationError, SyntaxError) as e:
-            self.logger.exception(e)
-            self.logger.error("Can't import app '{}'. Not switching!".format(app))
-            return self.task
+        module = self.registry.module(app)
+        task = self._cached(app)
+        if task is None:
+            self.registry.compile(app)
+            try:
+                exec("import {}".format(module), {})
+            except (ImportError, AttributeError, IndentationError, SyntaxError) as e:
+                self.logger.exception(e)
+                self.logger.error("Can't import app '{}'. Not switching!".format(app))
+                return self.task
         if self.app and self.task:
-            self.logger.debug('Closing app', self.app)
-            self.task.exit(self.REASON_EXIT_SYSTEM)
+            self.logger.debug('Suspending app', self.app)
+            self.task.suspend()
+            self.cache.append((self.app, self.task))
             self.task = None
             # Important to allow app to simply register listeners without checking for duplicates
             self.events.clear()
-            del sys.modules["apps.{}".format(self.app)]
-            gc.collect()
+        self.evict()
+        if self.display.policy:
+            self.display.policy.request_full()
         try:
-            self.logger.debug('Starting app', app)
             self.app = app
-            self.task = sys.modules["apps.{}".format(app)].App(self, screen, **kwargs)
+            if task is None:
+                self.logger.debug('Starting app', app)
+                self.task = sys.modules[module].App(self, screen, **kwargs)
+            else:
+                self.logger.debug('Resuming app', app)
+                self.task = task
+                task.resume(screen, **kwargs)
+            self.heap.start(app, self.task.HEAP_BUDGET)
         except Exception as e:
             self.logger.exception(e)
             self.display.reset()
@@ -259,6 +405,33 @@ class Kernel:
             return None
         return self.task
 
+    def _cached(self, app):
+        """
+        Takes a suspended app out of the cache
+        :return: The App instance or None if the app is not cached
+        """
+        for i in range(len(self.cache)):
+            if self.cache[i][0] == app:
+                return self.cache.pop(i)[1]
+        return None
+
+    def evict(self):
+        """
+        Exits and unloads suspended apps, least recently used first, until the cache fits into app_cache_size and
+        the free heap is above app_cache_watermark
+        """
+        self.heap.collect('load')
+        while self.cache and (len(self.cache) > self.app_cache_size or gc.mem_free() < self.app_cache_watermark):
+            app, task = self.cache.pop(0)
+            self.logger.debug('Closing app', app)
+            try:
+                task.exit(self.REASON_EXIT_SYSTEM)
+            except Exception as e:
+                self.logger.exception(e)
+            sys.modules.pop(self.registry.module(app), None)
+            task = None
+            self.heap.collect('evict')
+
     def name(self, app, info=None):
         if not info:
             info = self.app_info(app)
@@ -286,26 +459,25 @@ class Kernel:
     def app_info(self, app=None):
         if not app:
             return None
-        try:
-            with open('/apps/{}/info.json'.format(app)) as f:
-                info = json.load(f)
-        except Exception:
-            return None
-        return info
+        return self.registry.get(app)
 
     def active(self, app):
         if app == self.app:
             return self.task.NAME, self.task.is_active, self.task.version()
+        for name, task in self.cache:
+            if name == app:
+                return task.is_active
+        module = self.registry.module(app)
         try:
-            exec("import apps.{}".format(app), {})
+            exec("import {}".format(module), {})
         except (ImportError, AttributeError, IndentationError, SyntaxError) as e:
             self.logger.exception(e)
             return True
         try:
-            task = sys.modules["apps.{}".format(app)].App(self)
+            task = sys.modules[module].App(self)
             active = task.is_active
-            del sys.modules["apps.{}".format(app)]
-            gc.collect()
+            del sys.modules[module]
+            self.heap.collect('active')
         except Exception:
             return True
         return active
@@ -368,7 +540,9 @@ class Kernel:
             try:
                 with open(self.secret_file, 'r') as f:
                     self.secret = f.read()
-                    self.http.set_key(self.secret)
+                # HTTP receives the key on construction if it is not built yet
+                if self._http is not None:
+                    self._http.set_key(self.secret)
             except Exception as e:
                 pass
         return self.secret
@@ -394,15 +568,7 @@ class Kernel:
         if not self.storage.OTA or not self.storage.OTA_SERVER:
             return False
         self.display.text("Looking for updates...", 0, line=1, update=True)
-        versions = {}
-        try:
-            for app in os.listdir('/apps'):
-                versions[app] = self.version(app)
-        except OSError:
-            try:
-                os.mkdir('/apps')
-            except OSError:
-                pass
+        versions = self.registry.versions()
         try:
             update = self.http.post('/update', json=dict(versions=versions), raw=True)
             if update is None:
@@ -414,8 +580,10 @@ class Kernel:
                 # TODO: Extract file
                 # TODO: Check signature?
                 tar = TarFile(fileobj=update.raw)
+                installed = set()
                 for file in tar:
                     path = "/apps/" + file.name
+                    installed.add(file.name.strip('/').split('/')[0])
                     ensure(path)
                     if file.type is DIRTYPE:
                         # Delete old app files
@@ -429,6 +597,11 @@ class Kernel:
                                     break
                                 dest.write(buf)
                         # copyfileobj(tar.extractfile(file), open(path, "wb"))
+                # Apps left without files were removed and drop out of the index
+                for app in installed:
+                    if app:
+                        self.registry.register(app, save=False)
+                self.registry.save()
                 self.logger.info("Update installed!")
                 return True
             elif update.status_code is 204:
@@ -454,6 +627,19 @@ class Kernel:
             return self.storage.update()
         return False
 
+    def sleep(self, duration=None):
+        """
+        Saves a snapshot of the current state to RTC memory and enters deep sleep. On wake up the bootstrap resumes
+        the current app and screen from the snapshot instead of booting cold.
+        :param duration: Maximum time to sleep in ms, None to only wake up on input
+        """
+        if not Snapshot.save(Snapshot.capture(self)):
+            self.logger.warning("State too large for a snapshot, waking up cold")
+        self.wifi_off()
+        if duration:
+            machine.deepsleep(duration)
+        machine.deepsleep()
+
     def skip_checks(self):
         return self.input.is_pressed(Input.BTN_START)
 
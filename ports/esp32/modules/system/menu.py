@@ -39,7 +39,7 @@ class Menu:
         """
         self.display = display
         self.entries = entries
-        self.index = selected_index if selected_index else 0
+        self.index = min(selected_index, max(0, len(entries) - 1)) if selected_index else 0
         self.top = max(0, self.index - self.display.lines + 1)
 
     def update(self):
@@ -53,7 +53,8 @@ class Menu:
                 self.display.text(self.entries[i]["text"], 0, y=y, color=display.BACKGROUND, update=False)
             else:
                 self.display.text(self.entries[i]["text"], 0, y=y, update=False)
-        self.display.update()
+        # Keys are handled while the panel refreshes
+        self.display.update(wait=False)
 
     def up(self, update=True):
         if self.index == 0:
@@ -79,5 +80,18 @@ class Menu:
         if update:
             self.update()
 
+    def move(self, steps, update=True):
+        """
+        Moves the selection like repeated up() or down() calls with a single update
+        :param steps: Entries to move, negative to move up
+        """
+        for i in range(abs(steps)):
+            if steps > 0:
+                self.down(update=False)
+            else:
+                self.up(update=False)
+        if update:
+            self.update()
+
     def current(self):
         return self.entries[self.index]
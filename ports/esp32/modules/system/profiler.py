@@ -0,0 +1,170 @@
+# This file is part of the Troopers 19 Badge project, https://troopers.de/troopers19/
+#
+# The BSD 3-Clause License
+#
+# Copyright (c) 2019 "Malte Heinzelmann" <malte@hnzlmnn.de>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import ujson as json
+import ustruct as struct
+import utime as time
+
+from system.rtcmemory import RTCMemory
+
+
+class BootProfiler:
+    """
+    Measures the duration of every boot stage and keeps the last boots in a ring buffer in RTC memory.
+    """
+
+    STAGES = (
+        'display',
+        'lights',
+        'input',
+        'accel',
+        'storage',
+        'http',
+        'registration',
+        'registry',
+        'kernel',
+        'ensure_registration',
+        'wifi',
+        'ota',
+        'storage_update',
+        'app_load',
+        'total',
+    )
+
+    SLOTS = 8
+    MAGIC = 0x50
+    HEADER = '<BBBB'
+    RECORD = '<' + 'I' * len(STAGES)
+
+    def __init__(self):
+        self.started = time.ticks_us()
+        self.times = [0] * len(self.STAGES)
+        self.pending = {}
+        self.saved = False
+
+    def begin(self, stage):
+        self.pending[stage] = time.ticks_us()
+
+    def end(self, stage):
+        start = self.pending.pop(stage, None)
+        if start is None:
+            return
+        # Stages may run more than once (e.g. ensure_registration), their times add up
+        self.times[self.STAGES.index(stage)] += time.ticks_diff(time.ticks_us(), start)
+
+    def measure(self, stage, func, *args, **kwargs):
+        self.begin(stage)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.end(stage)
+
+    def save(self):
+        """
+        Appends the current boot to the ring buffer. Only the first call per boot has an effect.
+        """
+        if self.saved:
+            return
+        self.saved = True
+        self.times[self.STAGES.index('total')] = time.ticks_diff(time.ticks_us(), self.started)
+        header_size = struct.calcsize(self.HEADER)
+        record_size = struct.calcsize(self.RECORD)
+        data = bytearray(RTCMemory.read(RTCMemory.BOOT_PROFILES))
+        count, head = 0, 0
+        if len(data) >= header_size:
+            magic, stages, count, head = struct.unpack_from(self.HEADER, data)
+            if magic != self.MAGIC or stages != len(self.STAGES):
+                count, head = 0, 0
+        size = header_size + self.SLOTS * record_size
+        if len(data) < size:
+            data.extend(bytes(size - len(data)))
+        struct.pack_into(self.RECORD, data, header_size + head * record_size, *self.times)
+        count = min(count + 1, self.SLOTS)
+        head = (head + 1) % self.SLOTS
+        struct.pack_into(self.HEADER, data, 0, self.MAGIC, len(self.STAGES), count, head)
+        RTCMemory.write(RTCMemory.BOOT_PROFILES, data[:size])
+
+    @staticmethod
+    def load():
+        """
+        :return: The stored boot profiles (oldest first), each a tuple of microseconds per stage (0 = not run)
+        """
+        cls = BootProfiler
+        header_size = struct.calcsize(cls.HEADER)
+        record_size = struct.calcsize(cls.RECORD)
+        data = RTCMemory.read(RTCMemory.BOOT_PROFILES)
+        if len(data) < header_size:
+            return []
+        magic, stages, count, head = struct.unpack_from(cls.HEADER, data)
+        if magic != cls.MAGIC or stages != len(cls.STAGES) or len(data) < header_size + cls.SLOTS * record_size:
+            return []
+        profiles = []
+        for i in range(count):
+            slot = (head - count + i) % cls.SLOTS
+            profiles.append(struct.unpack_from(cls.RECORD, data, header_size + slot * record_size))
+        return profiles
+
+    @staticmethod
+    def clear():
+        RTCMemory.write(RTCMemory.BOOT_PROFILES, bytes(struct.calcsize(BootProfiler.HEADER)))
+
+
+def median(values):
+    values = sorted(values)
+    if not values:
+        return 0
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) // 2
+
+
+def report():
+    """
+    REPL helper: prints the per-stage medians of the stored boot profiles in ms
+    """
+    profiles = BootProfiler.load()
+    print('{} boot(s) recorded'.format(len(profiles)))
+    print('{:<20} {:>10} {:>10} {:>10}'.format('stage', 'median', 'min', 'max'))
+    for i, stage in enumerate(BootProfiler.STAGES):
+        # Skipped stages are recorded as 0
+        values = [profile[i] for profile in profiles if profile[i]]
+        if not values:
+            continue
+        print('{:<20} {:>10.1f} {:>10.1f} {:>10.1f}'.format(
+            stage, median(values) / 1000, min(values) / 1000, max(values) / 1000,
+        ))
+
+
+def dump():
+    """
+    REPL helper: prints the stored boot profiles as a single JSON line (used by boot_report.py on the host)
+    """
+    print(json.dumps(dict(stages=BootProfiler.STAGES, profiles=BootProfiler.load())))
@@ -0,0 +1,288 @@
+# This file is part of the Troopers 19 Badge project, https://troopers.de/troopers19/
+#
+# The BSD 3-Clause License
+#
+# Copyright (c) 2019 "Malte Heinzelmann" <malte@hnzlmnn.de>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import gc
+import os
+import sys
+import ujson as json
+import uhashlib as hashlib
+import ubinascii as binascii
+import utime as time
+
+try:
+    from esp import compile_mpy
+except ImportError:
+    compile_mpy = None
+
+
+def hash_file(path, length=512):
+    """
+    :return: Size and hex encoded SHA-256 of the file
+    """
+    h = hashlib.sha256()
+    size = 0
+    buf = bytearray(length)
+    with open(path, 'rb') as f:
+        while True:
+            sz = f.readinto(buf)
+            if not sz:
+                break
+            h.update(buf if sz == length else memoryview(buf)[:sz])
+            size += sz
+    return [size, binascii.hexlify(h.digest()).decode()]
+
+
+class AppRegistry:
+    """
+    Index of the apps installed to /apps. Written when apps are installed or removed so that the menu, the OTA
+    version check and the kernel don't need to scan the app directories on every boot.
+    Each entry holds name, title, version, active flag, entry module and [size, sha256] per file. Sources are
+    compiled to .mpy next to them, which the importer prefers, and 'mpy' holds the [size, sha256] of the
+    source each .mpy was compiled from.
+    """
+
+    FILE = '/apps.json'
+    ROOT = '/apps'
+
+    def __init__(self, kernel, file=None):
+        self.kernel = kernel
+        self._file = file if file else self.FILE
+        self._apps = None
+        # Active flags computed this boot for apps that don't set one in their info.json
+        self._active = {}
+
+    @property
+    def apps(self):
+        if self._apps is None:
+            self.kernel.profiler.measure('registry', self._load)
+        return self._apps
+
+    def _load(self):
+        try:
+            with open(self._file, 'r') as f:
+                apps = json.load(f)
+            if not isinstance(apps, dict):
+                raise ValueError("Only dicts can be loaded")
+            self._apps = apps
+        except (OSError, ValueError):
+            # No index yet, e.g. the first boot after a firmware update
+            self.rebuild()
+
+    def save(self):
+        with open(self._file, 'w') as f:
+            json.dump(self._apps, f)
+
+    def rebuild(self):
+        """
+        Scans /apps once and rewrites the index
+        """
+        self._apps = {}
+        try:
+            names = os.listdir(self.ROOT)
+        except OSError:
+            names = []
+        for app in names:
+            self.register(app, save=False)
+        self.save()
+
+    def register(self, app, files=None, save=True):
+        """
+        Adds or refreshes the entry of an installed app
+        :param app: Name of the app directory
+        :param files: [size, sha256] by path relative to the app directory, hashed from flash if None
+        :param save: Write the index
+        """
+        root = '{}/{}'.format(self.ROOT, app)
+        if files is None:
+            files = {}
+            self._hash_dir(root, '', files)
+        if not files:
+            return self.remove(app, save)
+        try:
+            with open(root + '/info.json', 'r') as f:
+                info = json.load(f)
+            if not isinstance(info, dict):
+                info = {}
+        except (OSError, ValueError):
+            info = {}
+        name = info.get('name', app[:1].upper() + app[1:])
+        # Keep bytecode whose source didn't change, drop the rest
+        cached = {}
+        previous = self.apps.get(app, None)
+        for rel, key in (previous.get('mpy', {}) if previous else {}).items():
+            if files.get(rel, None) == key:
+                cached[rel] = key
+            else:
+                self._remove_mpy(app, rel)
+        self.apps[app] = dict(
+            name=name,
+            title=info.get('title', name),
+            version=info.get('version', -1),
+            # None if the app is asked, see active()
+            active=info.get('active', None),
+            module=info.get('module', 'apps.{}'.format(app)),
+            files=files,
+            mpy=cached,
+        )
+        self._active.pop(app, None)
+        if save:
+            self.save()
+
+    def _hash_dir(self, root, path, files):
+        for entry in os.listdir(root + '/' + path if path else root):
+            rel = path + '/' + entry if path else entry
+            full = root + '/' + rel
+            if os.stat(full)[0] & 0x4000:
+                self._hash_dir(root, rel, files)
+            elif not entry.endswith('.mpy'):
+                files[rel] = hash_file(full)
+
+    def _remove_mpy(self, app, rel):
+        try:
+            os.remove('{}/{}/{}.mpy'.format(self.ROOT, app, rel[:-3]))
+        except OSError:
+            pass
+
+    def remove(self, app, save=True):
+        self._active.pop(app, None)
+        if self.apps.pop(app, None) is not None and save:
+            self.save()
+
+    def compile(self, app):
+        """
+        Compiles the sources of an app whose bytecode is missing or was compiled from a different source
+        :return: True if the index changed
+        """
+        entry = self.get(app)
+        if entry is None or compile_mpy is None:
+            return False
+        cached = entry.setdefault('mpy', {})
+        changed = False
+        for rel, key in entry['files'].items():
+            if not rel.endswith('.py') or cached.get(rel, None) == key:
+                continue
+            source = '{}/{}/{}'.format(self.ROOT, app, rel)
+            changed = True
+            cached.pop(rel, None)
+            try:
+                with open(source[:-3] + '.mpy', 'wb') as f:
+                    compile_mpy(source, f)
+                cached[rel] = key
+            except Exception as e:
+                # Imported from source, where the error is reported
+                self._remove_mpy(app, rel)
+                self.kernel.logger.exception(e)
+            self.kernel.heap.collect('compile')
+        if changed:
+            self.save()
+        return changed
+
+    def get(self, app):
+        return self.apps.get(app, None)
+
+    def module(self, app):
+        entry = self.get(app)
+        if entry:
+            return entry['module']
+        return 'apps.{}'.format(app)
+
+    def versions(self):
+        return dict((app, entry['version']) for app, entry in self.apps.items())
+
+    def active(self, app):
+        """
+        Apps without an active flag in their info.json are instantiated once per boot, whether they are active may
+        depend on the state of the badge
+        """
+        entry = self.get(app)
+        if entry is None:
+            return False
+        if entry['active'] is not None:
+            return entry['active']
+        active = self._active.get(app, None)
+        if active is None:
+            active = bool(self.kernel.active(app))
+            self._active[app] = active
+        return active
+
+    def menu(self):
+        """
+        :return: Menu entries of the installed apps that are active
+        """
+        entries = {}
+        for app in self.apps:
+            if app == self.kernel.MENU_APP:
+                continue
+            entry = self.apps[app]
+            if entry['title'] and self.active(app):
+                entries[app] = {'text': entry['title'], 'action': app}
+        return entries
+
+
+def benchmark(kernel, app, runs=3):
+    """
+    Prints how long importing an installed app takes from source and from its bytecode cache
+    :param kernel: The running kernel
+    :param app: Name of the app, it must not be loaded
+    :param runs: Number of imports per variant
+    """
+    registry = kernel.registry
+    if app == kernel.app or app in [name for name, task in kernel.cache]:
+        print("Can't benchmark a loaded app")
+        return
+    registry.compile(app)
+    entry = registry.get(app)
+    if not entry or not entry['mpy']:
+        print("No bytecode cached for", app)
+        return
+    module = entry['module']
+    compiled = ['{}/{}/{}.mpy'.format(registry.ROOT, app, rel[:-3]) for rel in entry['mpy']]
+    print("{:<8} {:>8} {:>8}".format('import', 'ms', 'bytes'))
+    for label in ('source', 'bytecode'):
+        if label == 'source':
+            for path in compiled:
+                os.rename(path, path + '_')
+        try:
+            times = []
+            allocs = []
+            for i in range(runs):
+                gc.collect()
+                alloc = gc.mem_alloc()
+                start = time.ticks_us()
+                __import__(module)
+                times.append(time.ticks_diff(time.ticks_us(), start))
+                allocs.append(gc.mem_alloc() - alloc)
+                for name in [name for name in sys.modules if name == module or name.startswith(module + '.')]:
+                    del sys.modules[name]
+        finally:
+            if label == 'source':
+                for path in compiled:
+                    os.rename(path + '_', path)
+        print("{:<8} {:>8.1f} {:>8}".format(label, sum(times) / runs / 1000, sum(allocs) // runs))
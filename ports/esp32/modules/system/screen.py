@@ -28,7 +28,7 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-from system import Kernel, Input
+from system import Kernel, Input, Event
 import utime
 
 
@@ -44,6 +44,13 @@ class Screen:
         self.running = False
         self.menu = None
         self.selected_index = selected_index
+        # Only highlights a menu entry, unlike selected_index which also selects it
+        self.menu_index = None
+        # Menu moves not drawn yet, they are coalesced until the queued input is handled
+        self.moves = 0
+        self.moving = False
+        self.stale = False
+        self.move_event = Event('screen.move', self)
 
     def __getattr__(self, item):
         try:
@@ -62,6 +69,10 @@ class Screen:
         self.running = True
         self.init()
         self.register()
+        # Runs alongside the screen until the events are cleared for the next screen or app
+        coro = self.background()
+        if coro is not None:
+            self.events.create_task(coro)
         if self.continuous_rendering:
             last = None
             while self.running:
@@ -82,12 +93,17 @@ class Screen:
             self.events.on("input.text", self._event_handler)
             # Handle automatic menu creation
             if self.MENU_ITEMS:
-                self.menu = self.app.menu(self.MENU_ITEMS, self.selected_index)
+                self.menu = self.app.menu(self.MENU_ITEMS, self.selected_index if self.selected_index else self.menu_index)
             if self.menu:
                 self.events.on('input.up.{}'.format(Input.key_name(Input.BTN_UP)), self._event_handler)
                 self.events.on('input.up.{}'.format(Input.key_name(Input.BTN_DOWN)), self._event_handler)
+                # Holding up or down scrolls
+                self.events.on('input.repeat.{}'.format(Input.key_name(Input.BTN_UP)), self._event_handler)
+                self.events.on('input.repeat.{}'.format(Input.key_name(Input.BTN_DOWN)), self._event_handler)
                 self.events.on('input.up.{}'.format(Input.key_name(Input.BTN_A)), self._event_handler)
                 self.events.on('input.up.{}'.format(Input.key_name(Input.BTN_SELECT)), self._event_handler)
+                self.events.on('screen.move', self.on_move)
+                self.events.on('display.done', self.on_move)
                 if self.selected_index:
                     return self.on_menu_selection(self.menu.current())
             self.do_render()
@@ -127,6 +143,9 @@ class Screen:
         selected_index = kwargs.get('selected_index', None)
         if selected_index:
             self.selected_index = selected_index
+        menu_index = kwargs.get('menu_index', None)
+        if menu_index is not None:
+            self.menu_index = menu_index
 
     def register(self):
         """
@@ -134,6 +153,13 @@ class Screen:
         """
         pass
 
+    def background(self):
+        """
+        Override with a coroutine (async def) to do work like network requests while the screen handles keys,
+        see system.tasks
+        """
+        return None
+
     def update(self, delta=0):
         """
         For non continuous rendering this method is called once. For continuous rendering this method is called every frame.
@@ -171,12 +197,47 @@ class Screen:
         """
         pass
 
+    def move(self, steps):
+        """
+        Moves the menu selection. The update is deferred until the event loop has handled the input queued meanwhile,
+        key presses during a display refresh end up in a single update.
+        :param steps: Entries to move, negative to move up
+        """
+        self.moves += steps
+        if not self.moving:
+            self.moving = True
+            self.events.post(self.move_event)
+
+    def on_move(self, event):
+        if event.sender is not self and not (self.moving and event.sender is self.display):
+            return
+        if self.display.refreshing:
+            # Drawn when the refresh finished, display.done comes back here
+            return
+        self.moving = False
+        self.apply_moves()
+
+    def apply_moves(self, update=True):
+        moves = self.moves
+        self.moves = 0
+        if moves:
+            self.menu.move(moves, update=update)
+            self.stale = not update
+        elif update and self.stale:
+            self.menu.update()
+            self.stale = False
+
     def _event_handler(self, event):
+        if self.menu and event.type is Input.UP and event.count and (event.code is Input.BTN_UP or event.code is Input.BTN_DOWN):
+            # Released after scrolling
+            return
         if self.menu and event.code is Input.BTN_UP:
-            self.menu.up()
+            self.move(-1)
         elif self.menu and event.code is Input.BTN_DOWN:
-            self.menu.down()
+            self.move(1)
         elif self.menu and self.input.mode() is not Input.MODE_TEXT and (event.code is Input.BTN_A or event.code is Input.BTN_SELECT):
+            # Select the entry the queued moves end on, drawn later if the screen stays
+            self.apply_moves(update=False)
             return self.on_menu_selection(self.menu.current())
         elif event.name == 'input.text':
             self.input.mode(Input.MODE_DEFAULT)
@@ -0,0 +1,131 @@
+# This file is part of the Troopers 19 Badge project, https://troopers.de/troopers19/
+#
+# The BSD 3-Clause License
+#
+# Copyright (c) 2019 "Malte Heinzelmann" <malte@hnzlmnn.de>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+class SequenceMatcher:
+    """
+    Matches key sequences with an Aho-Corasick automaton. The transitions of every state are precomputed,
+    so a key costs a single dict lookup however many sequences are registered.
+    The automaton is rebuilt on the first key after the sequences changed.
+    """
+
+    def __init__(self):
+        # name -> tuple of symbols
+        self.sequences = {}
+        self.state = 0
+        self.delta = None
+        # By state: names of the sequences matched, of the sequences it is a prefix of, the fallback and the depth
+        self.outputs = None
+        self.prefixes = None
+        self.fail = None
+        self.depth = None
+
+    def add(self, name, symbols):
+        """
+        :param name: Name of the sequence, replaces a sequence of the same name
+        :param symbols: The symbols in order
+        """
+        if not symbols:
+            raise ValueError('Empty sequence')
+        self.sequences[name] = tuple(symbols)
+        self.delta = None
+
+    def remove(self, name):
+        if self.sequences.pop(name, None) is not None:
+            self.delta = None
+
+    def build(self):
+        delta = [{}]
+        outputs = [()]
+        prefixes = [()]
+        depth = [0]
+        for name, symbols in self.sequences.items():
+            state = 0
+            for symbol in symbols:
+                next = delta[state].get(symbol)
+                if next is None:
+                    next = len(delta)
+                    delta[state][symbol] = next
+                    delta.append({})
+                    outputs.append(())
+                    prefixes.append(())
+                    depth.append(depth[state] + 1)
+                state = next
+                prefixes[state] += (name,)
+            outputs[state] += (name,)
+        alphabet = set()
+        for symbols in self.sequences.values():
+            alphabet.update(symbols)
+        # Breadth first, the fallback of a state is shallower and already complete
+        fail = [0] * len(delta)
+        queue = [0]
+        for state in queue:
+            goto = delta[state]
+            children = [(symbol, goto[symbol]) for symbol in goto]
+            if state:
+                for symbol in alphabet:
+                    if symbol not in goto:
+                        goto[symbol] = delta[fail[state]].get(symbol, 0)
+            for symbol, child in children:
+                fail[child] = delta[fail[state]].get(symbol, 0) if state else 0
+                outputs[child] += outputs[fail[child]]
+                queue.append(child)
+        self.delta = delta
+        self.outputs = outputs
+        self.prefixes = prefixes
+        self.fail = fail
+        self.depth = depth
+        self.state = 0
+
+    def feed(self, symbol):
+        """
+        Advances the automaton
+        :return: Names of the sequences ending with this symbol
+        """
+        if self.delta is None:
+            self.build()
+        self.state = self.delta[self.state].get(symbol, 0)
+        return self.outputs[self.state]
+
+    def progress(self, name):
+        """
+        :return: Number of symbols of the sequence entered so far
+        """
+        if self.delta is None:
+            self.build()
+        state = self.state
+        while state:
+            if name in self.prefixes[state]:
+                return self.depth[state]
+            state = self.fail[state]
+        return 0
+
+    def reset(self):
+        self.state = 0
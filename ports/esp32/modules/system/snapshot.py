@@ -0,0 +1,96 @@
+# This file is part of the Troopers 19 Badge project, https://troopers.de/troopers19/
+#
+# The BSD 3-Clause License
+#
+# Copyright (c) 2019 "Malte Heinzelmann" <malte@hnzlmnn.de>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import ujson as json
+import ustruct as struct
+
+from system.rtcmemory import RTCMemory
+
+
+class Snapshot:
+    """
+    The state needed to resume the foreground app after waking up from deep sleep, kept in RTC memory.
+    """
+
+    MAGIC = 0x53
+    HEADER = '<BH'
+
+    @staticmethod
+    def capture(kernel):
+        state = dict(
+            app=kernel.app,
+            screen=0,
+            menu_index=None,
+            rotation=kernel.display.rotation(),
+            font=kernel.display.font(),
+            inverted=kernel.display.inverted(),
+            storage=kernel.storage.hot(),
+        )
+        task = kernel.task
+        if task and task.screen in task.screens:
+            state['screen'] = task.screens.index(task.screen)
+            if task.screen.menu:
+                state['menu_index'] = task.screen.menu.index
+        return state
+
+    @staticmethod
+    def save(state):
+        data = json.dumps(state).encode('utf8')
+        header_size = struct.calcsize(Snapshot.HEADER)
+        if header_size + len(data) > RTCMemory.SNAPSHOT[1]:
+            # Never resume a stale state, wake up cold instead
+            Snapshot.clear()
+            return False
+        RTCMemory.write(RTCMemory.SNAPSHOT, struct.pack(Snapshot.HEADER, Snapshot.MAGIC, len(data)) + data)
+        return True
+
+    @staticmethod
+    def load():
+        """
+        :return: The saved state or None if there is no valid snapshot
+        """
+        data = RTCMemory.read(RTCMemory.SNAPSHOT)
+        header_size = struct.calcsize(Snapshot.HEADER)
+        if len(data) < header_size:
+            return None
+        magic, length = struct.unpack_from(Snapshot.HEADER, data)
+        if magic != Snapshot.MAGIC or header_size + length > len(data):
+            return None
+        try:
+            state = json.loads(data[header_size:header_size + length])
+        except ValueError:
+            return None
+        if not isinstance(state, dict) or not state.get('app', None):
+            return None
+        return state
+
+    @staticmethod
+    def clear():
+        RTCMemory.write(RTCMemory.SNAPSHOT, bytes(struct.calcsize(Snapshot.HEADER)))
@@ -34,10 +34,24 @@ import os
 
 class Storage:
 
-    def __init__(self, kernel, file, defaults={}):
+    # Keys kept in the deep sleep snapshot, values larger than HOT_MAX_LEN are left out. RTC memory survives a
+    # reset, so no credentials.
+    HOT = ('NAME', 'IMAGE', 'OTA', 'OTA_SERVER', 'RESTART')
+    HOT_MAX_LEN = 128
+
+    def __init__(self, kernel, file, defaults={}, hot=None):
+        """
+        :param hot: Values restored from a snapshot. The file is only parsed once another key is accessed.
+        """
         self.kernel = kernel
         self._file = file
         self._data = defaults
+        self._hot = hot
+        if hot is None:
+            self._load()
+
+    def _load(self):
+        self._hot = None
         try:
             with open(self._file, 'r') as f:
                 data = json.load(f)
@@ -48,10 +62,23 @@ class Storage:
             pass
         self._data.setdefault('_settings', {})
 
+    def _ensure(self):
+        if self._hot is not None:
+            self._load()
+
+    def hot(self):
+        if self._hot is not None:
+            return self._hot
+        hot = {}
+        for key in self.HOT:
+            value = self._data.get(key, None)
+            if value is None or type(value) is bool or len(str(value)) <= self.HOT_MAX_LEN:
+                hot[key] = value
+        return hot
+
     def update(self):
+        self._ensure()
         result = self.kernel.http.post('/settings/update')
-        import gc
-        gc.collect()
         if result is None:
             return False
         if result.status_code is not 200:
@@ -78,25 +105,33 @@ class Storage:
         return True
 
     def _save(self, remote=True):
+        self._ensure()
         with open(self._file, 'w') as f:
             json.dump(self._data, f)
 
     def __getattr__(self, item):
-        return self._data.get(item, None)
+        return self[item]
 
     def __getitem__(self, item):
+        if self._hot is not None:
+            if item in self._hot:
+                return self._hot[item]
+            self._load()
         return self._data.get(item, None)
 
     def __setitem__(self, key, value):
+        self._ensure()
         self._data[key] = value
         self._save()
 
     def get(self, item, default=None):
         if not item.startswith(self.kernel.app + '.'):
             return default
+        self._ensure()
         return self._data['_settings'].get(item, default)
 
     def set(self, key, value):
+        self._ensure()
         result = self.kernel.http.post('/settings/set', json={key: value})
         if result is not None and result.status_code is 204:
             self._data['_settings'][key] = value
@@ -0,0 +1,163 @@
+# This file is part of the Troopers 19 Badge project, https://troopers.de/troopers19/
+#
+# The BSD 3-Clause License
+#
+# Copyright (c) 2019 "Malte Heinzelmann" <malte@hnzlmnn.de>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import uselect
+
+
+class CancelledError(Exception):
+    pass
+
+
+class Awaitable:
+    """
+    Something a task waits for. The task yields it to the event loop, which calls wait() and later resumes the task
+    with the value of the await expression or an error raised in the task.
+    """
+
+    def __iter__(self):
+        value = yield self
+        return value
+
+    def wait(self, loop, task):
+        raise NotImplementedError()
+
+
+class Sleep(Awaitable):
+
+    def __init__(self, ms):
+        self.ms = ms
+
+    def wait(self, loop, task):
+        try:
+            loop.call_later(self.ms, loop.resume, task, persistent=task.persistent)
+        except IndexError as e:
+            # The timer queue is full
+            loop.resume(task, error=e)
+
+
+class IOWait(Awaitable):
+
+    def __init__(self, stream, mask):
+        self.stream = stream
+        self.mask = mask
+
+    def wait(self, loop, task):
+        loop.add_io(self.stream, self.mask, task)
+
+
+class EventWait(Awaitable):
+
+    def __init__(self, name):
+        self.name = name
+
+    def wait(self, loop, task):
+        loop.listen(task, self.name, lambda event: loop.resume(task, event))
+
+
+class Job(Awaitable):
+
+    def __init__(self, worker, name, func, args, kwargs):
+        self.worker = worker
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def wait(self, loop, task):
+        def done(event):
+            if event.error is not None:
+                loop.resume(task, error=event.error)
+            else:
+                loop.resume(task, event.result)
+        loop.listen(task, 'worker.' + self.name, done)
+        if not self.worker.submit(self.name, self.func, *self.args, **self.kwargs):
+            loop.off(task.listening[1])
+            task.listening = None
+            loop.resume(task, error=RuntimeError('Worker queue is full'))
+
+
+class Task(Awaitable):
+    """
+    A coroutine run by the event loop, see EventLoop.create_task(). Awaiting a task returns its result.
+    """
+
+    def __init__(self, loop, coro, persistent=False):
+        """
+        :param persistent: Keep running when the loop is cleared for the next app
+        """
+        self.loop = loop
+        self.coro = coro
+        self.persistent = persistent
+        self.done = False
+        self.result = None
+        self.error = None
+        # Tasks awaiting this one
+        self.waiters = []
+        # (name, listener) of the event it waits for, see EventLoop.listen()
+        self.listening = None
+
+    def wait(self, loop, task):
+        if self.done:
+            loop.resume(task, self.result, self.error)
+        else:
+            self.waiters.append(task)
+
+    def cancel(self):
+        """
+        Stops the task, the tasks awaiting it get a CancelledError
+        """
+        if not self.done:
+            self.coro.close()
+            self.loop.finish(self, None, CancelledError())
+
+
+def sleep_ms(ms):
+    """
+    await sleep_ms(100) suspends the task for 100 ms
+    """
+    return Sleep(ms)
+
+
+def readable(stream):
+    """
+    await readable(socket) suspends the task until the socket has data, it should be non-blocking
+    """
+    return IOWait(stream, uselect.POLLIN)
+
+
+def writable(stream):
+    return IOWait(stream, uselect.POLLOUT)
+
+
+def next_event(name):
+    """
+    await next_event('input.up') suspends the task until the next matching event and returns it
+    """
+    return EventWait(name)
@@ -0,0 +1,131 @@
+# This file is part of the Troopers 19 Badge project, https://troopers.de/troopers19/
+#
+# The BSD 3-Clause License
+#
+# Copyright (c) 2019 "Malte Heinzelmann" <malte@hnzlmnn.de>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import _thread
+
+from system.events import Event
+from system.tasks import Job
+
+
+class Worker:
+    """
+    Runs blocking jobs like network requests in a background thread so that screens stay responsive.
+    When a job finishes a 'worker.<name>' event with the result (or the error) is posted to the event loop.
+    Jobs must not draw to the display.
+    """
+
+    QUEUE_SIZE = 4
+    # TLS handshakes need a large stack
+    STACK_SIZE = 16 * 1024
+
+    def __init__(self, kernel, size=None):
+        """
+        :param kernel: The kernel, its event loop receives the results
+        :param size: Maximum number of queued jobs
+        """
+        self.kernel = kernel
+        self.size = size if size else self.QUEUE_SIZE
+        self.jobs = []
+        self.busy = None
+        self.started = False
+        # Identifier of the worker thread once it runs
+        self.thread = None
+        self._lock = _thread.allocate_lock()
+        # Held while there is nothing to do, released by submit()
+        self._wake = _thread.allocate_lock()
+        self._wake.acquire()
+
+    def submit(self, name, func, *args, **kwargs):
+        """
+        Queues a job, the thread is started with the first one
+        :param name: Name of the job, the result is posted as 'worker.<name>'
+        :param func: Callable doing the work
+        :return: False if the queue is full
+        """
+        with self._lock:
+            if len(self.jobs) >= self.size:
+                return False
+            self.jobs.append((name, func, args, kwargs))
+            if not self.started:
+                self.started = True
+                _thread.stack_size(self.STACK_SIZE)
+                _thread.start_new_thread(self._run, ())
+        try:
+            self._wake.release()
+        except RuntimeError:
+            # Already woken up
+            pass
+        return True
+
+    def call(self, name, func, *args, **kwargs):
+        """
+        Like submit() for tasks, await worker.call(...) returns the result or raises the error of the job
+        """
+        return Job(self, name, func, args, kwargs)
+
+    def pending(self, name=None):
+        """
+        :param name: Only count jobs with this name
+        :return: Number of queued and running jobs
+        """
+        with self._lock:
+            count = 1 if self.busy is not None and (name is None or self.busy == name) else 0
+            for job in self.jobs:
+                if name is None or job[0] == name:
+                    count += 1
+        return count
+
+    def current(self):
+        """
+        :return: True if called from the worker thread
+        """
+        return self.thread is not None and _thread.get_ident() == self.thread
+
+    def _run(self):
+        self.thread = _thread.get_ident()
+        while True:
+            with self._lock:
+                job = self.jobs.pop(0) if self.jobs else None
+                if job is not None:
+                    self.busy = job[0]
+            if job is None:
+                self._wake.acquire()
+                continue
+            name, func, args, kwargs = job
+            result = None
+            error = None
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                error = e
+                self.kernel.logger.exception(e)
+            with self._lock:
+                self.busy = None
+            self.kernel.events.post(Event('worker.' + name, self, dict(result=result, error=error)))
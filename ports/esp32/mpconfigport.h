@@ -14,6 +14,9 @@
 
 // emitters
 #define MICROPY_PERSISTENT_CODE_LOAD        (1)
+#define MICROPY_PERSISTENT_CODE_SAVE        (1)
+#define MICROPY_PERSISTENT_CODE_PREFER_MPY  (1)
+#define MICROPY_PERSISTENT_CODE_PREFER_MPY_DIR "apps/"
 
 // compiler configuration
 #define MICROPY_COMP_MODULE_CONST           (1)
@@ -237,12 +240,15 @@ extern const struct _mp_obj_module_t mp_module_display;
 #endif
 
 #if MICROPY_PY_THREAD
+#include "freertos/task.h"
+// sleeps for up to a tick, interrupts wake the main task early (see mp_hal_wake_main_task_from_isr)
 #define MICROPY_EVENT_POLL_HOOK \
     do { \
         extern void mp_handle_pending(void); \
         mp_handle_pending(); \
         MICROPY_PY_USOCKET_EVENTS_HANDLER \
         MP_THREAD_GIL_EXIT(); \
+        ulTaskNotifyTake(pdFALSE, 1); \
         MP_THREAD_GIL_ENTER(); \
     } while (0);
 #else
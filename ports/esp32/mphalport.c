@@ -52,7 +52,9 @@ int mp_hal_stdin_rx_chr(void) {
             return c;
         }
         MICROPY_EVENT_POLL_HOOK
+        #if !MICROPY_PY_THREAD
         ulTaskNotifyTake(pdFALSE, 1);
+        #endif
     }
 }
 
@@ -115,7 +117,9 @@ void mp_hal_delay_ms(uint32_t ms) {
             break;
         }
         MICROPY_EVENT_POLL_HOOK
+        #if !MICROPY_PY_THREAD
         ulTaskNotifyTake(pdFALSE, 1);
+        #endif
     }
     if (dt < us) {
         // do the remaining delay accurately
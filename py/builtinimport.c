@@ -66,17 +66,45 @@ STATIC mp_import_stat_t mp_import_stat_any(const char *path) {
     return mp_import_stat(path);
 }
 
+#if MICROPY_PERSISTENT_CODE_LOAD && MICROPY_PERSISTENT_CODE_PREFER_MPY
+// Whether the .mpy file of a path is looked for first. Only in the directory whose bytecode is
+// kept up to date with its sources, a path relative to the root counts as well.
+STATIC bool prefer_mpy(const char *path) {
+    if (*path == PATH_SEP_CHAR) {
+        path++;
+    }
+    return strncmp(path, MICROPY_PERSISTENT_CODE_PREFER_MPY_DIR, sizeof(MICROPY_PERSISTENT_CODE_PREFER_MPY_DIR) - 1) == 0;
+}
+#endif
+
 STATIC mp_import_stat_t stat_file_py_or_mpy(vstr_t *path) {
+    #if MICROPY_PERSISTENT_CODE_LOAD
+    bool mpy_first = false;
+    #if MICROPY_PERSISTENT_CODE_PREFER_MPY
+    // Bytecode compiled from the source next to it, the source is the fallback
+    mpy_first = prefer_mpy(vstr_null_terminated_str(path));
+    if (mpy_first) {
+        vstr_ins_byte(path, path->len - 2, 'm');
+        if (mp_import_stat_any(vstr_null_terminated_str(path)) == MP_IMPORT_STAT_FILE) {
+            return MP_IMPORT_STAT_FILE;
+        }
+        vstr_cut_out_bytes(path, path->len - 3, 1);
+    }
+    #endif
+    #endif
+
     mp_import_stat_t stat = mp_import_stat_any(vstr_null_terminated_str(path));
     if (stat == MP_IMPORT_STAT_FILE) {
         return stat;
     }
 
     #if MICROPY_PERSISTENT_CODE_LOAD
-    vstr_ins_byte(path, path->len - 2, 'm');
-    stat = mp_import_stat_any(vstr_null_terminated_str(path));
-    if (stat == MP_IMPORT_STAT_FILE) {
-        return stat;
+    if (!mpy_first) {
+        vstr_ins_byte(path, path->len - 2, 'm');
+        stat = mp_import_stat_any(vstr_null_terminated_str(path));
+        if (stat == MP_IMPORT_STAT_FILE) {
+            return stat;
+        }
     }
     #endif
 
@@ -272,6 +272,25 @@
 #define MICROPY_PERSISTENT_CODE_SAVE (0)
 #endif
 
+// Whether mp_raw_code_save_file is available, it writes .mpy files using POSIX file I/O
+#ifndef MICROPY_PERSISTENT_CODE_SAVE_FILE
+#if defined(__i386__) || defined(__x86_64__) || defined(__unix__)
+#define MICROPY_PERSISTENT_CODE_SAVE_FILE (1)
+#else
+#define MICROPY_PERSISTENT_CODE_SAVE_FILE (0)
+#endif
+#endif
+
+// Whether the importer looks for a .mpy file before the .py file of the same name
+#ifndef MICROPY_PERSISTENT_CODE_PREFER_MPY
+#define MICROPY_PERSISTENT_CODE_PREFER_MPY (0)
+#endif
+
+// Path prefix the .mpy file is preferred in, elsewhere a stale .mpy would shadow an edited .py
+#ifndef MICROPY_PERSISTENT_CODE_PREFER_MPY_DIR
+#define MICROPY_PERSISTENT_CODE_PREFER_MPY_DIR ""
+#endif
+
 // Whether generated code can persist independently of the VM/runtime instance
 // This is enabled automatically when needed by other features
 #ifndef MICROPY_PERSISTENT_CODE
@@ -377,7 +377,7 @@ void mp_raw_code_save(mp_raw_code_t *rc, mp_print_t *print) {
 // here we define mp_raw_code_save_file depending on the port
 // TODO abstract this away properly
 
-#if defined(__i386__) || defined(__x86_64__) || defined(__unix__)
+#if MICROPY_PERSISTENT_CODE_SAVE_FILE
 
 #include <unistd.h>
 #include <sys/stat.h>
@@ -396,8 +396,6 @@ void mp_raw_code_save_file(mp_raw_code_t *rc, const char *filename) {
     close(fd);
 }
 
-#else
-#error mp_raw_code_save_file not implemented for this platform
 #endif
 
 #endif // MICROPY_PERSISTENT_CODE_SAVE
@@ -0,0 +1,62 @@
+# Choosing the refresh waveform of display updates
+import stubs
+
+import display
+from system import App, EventLoop
+from libs import RefreshPolicy
+
+MODES = {display.MODE_PARTIAL: 'partial', display.MODE_FULL: 'full'}
+
+# Partial refreshes are counted per region, a region reaching the threshold gets a full refresh
+policy = RefreshPolicy(3, 2, 1)
+print([MODES[policy.choose((0, 0, 10, 10), 100, 50)] for i in range(3)], list(policy.counts))
+policy.reset()
+print(MODES[policy.choose((40, 20, 20, 10), 100, 50)], list(policy.counts))
+print(MODES[policy.choose(None, 100, 50)], list(policy.counts))
+policy.request_full()
+print(MODES[policy.choose((90, 0, 10, 10), 100, 50)], list(policy.counts))
+
+# Loading a screen asks for a full refresh
+class Lights:
+
+    def off(self):
+        pass
+
+
+class Display:
+    # The unix build prints every update, only the policy is needed here
+
+    def __init__(self):
+        self.policy = RefreshPolicy()
+
+    def reset(self):
+        pass
+
+
+class Kernel:
+
+    def __init__(self, display):
+        self.display = display
+        self.events = EventLoop()
+        self.lights = Lights()
+
+
+class Screen:
+
+    def __init__(self, name):
+        self.name = name
+
+    def init(self, **kwargs):
+        pass
+
+
+class TestApp(App):
+    screens = [Screen('first'), Screen('second')]
+
+
+d = Display()
+app = TestApp(Kernel(d))
+print(d.policy.full, app.load(1).name, d.policy.full)
+print(MODES[d.policy.choose((0, 0, 8, 8), 296, 128)])
+d.policy.reset()
+print(d.policy.full, list(d.policy.counts))
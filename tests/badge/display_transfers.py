@@ -0,0 +1,25 @@
+# SPI transfers of the e-paper driver, the unix build sends them without a panel
+import stubs
+
+import display
+
+# The frame isn't printed, only the counts are compared
+panel = display.Display(bytearray(128 * 296 // 8), None, 128, 296, font=display.FONT_DEJAVU_12, dump=False)
+
+
+def update(*args, **kwargs):
+    sent = panel.update(*args, **kwargs)
+    print(sent, panel.transfers()[:2])
+
+
+# A full frame is one burst after the commands
+update(full=True)
+# The other RAM bank still lacks the full frame
+update(0, 0, 8, 8)
+# A window narrower than the panel is sent row by row, with the window of the previous update
+update(16, 0, 8, 8)
+# Nothing drawn, nothing sent
+update()
+# A pixel, along with what the other bank lacks
+panel.pixel(3, 3, 1)
+update()
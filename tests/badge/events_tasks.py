@@ -0,0 +1,138 @@
+# Tasks on the event loop: scheduling, cancellation and clear()
+import stubs
+
+from system.events import Event, EventLoop
+from system.tasks import CancelledError, sleep_ms, next_event
+
+
+def run(loop):
+    # Runs the loop until nothing is left to wait for
+    loop.result = None
+    loop.keep_listening()
+
+
+# Tasks interleave at bare yields and sleeps end in deadline order
+loop = EventLoop()
+log = []
+
+
+async def ticker(name, count):
+    for i in range(count):
+        log.append((name, i))
+        yield
+
+
+async def sleeper(name, ms):
+    await sleep_ms(ms)
+    log.append(name)
+    return ms
+
+
+loop.create_task(ticker('a', 2))
+loop.create_task(ticker('b', 2))
+run(loop)
+print(log)
+
+log = []
+loop.create_task(sleeper('late', 30))
+loop.create_task(sleeper('early', 10))
+run(loop)
+print(log, len(loop.tasks))
+
+
+# Awaiting a task returns its result or raises its error
+async def parent():
+    child = loop.create_task(sleeper('child', 5))
+    return (await child) + 1
+
+
+async def failing():
+    raise ValueError('failed')
+
+
+async def catcher():
+    try:
+        await loop.create_task(failing())
+    except ValueError as e:
+        return 'caught ' + str(e)
+
+
+log = []
+tasks = [loop.create_task(parent()), loop.create_task(catcher())]
+run(loop)
+print(log, [task.result for task in tasks])
+
+
+# Yielding something that isn't awaitable raises a TypeError in the task
+async def bad():
+    try:
+        yield 42
+    except TypeError:
+        return 'TypeError'
+
+
+task = loop.create_task(bad())
+run(loop)
+print(task.result, len(loop.tasks))
+
+
+# Cancelling a task resumes its waiters with a CancelledError
+async def waiter(task):
+    try:
+        await task
+    except CancelledError:
+        return 'cancelled'
+
+
+sleeping = loop.create_task(sleeper('never', 10000))
+waiting = loop.create_task(waiter(sleeping))
+loop.dispatch()
+sleeping.cancel()
+run(loop)
+print(sleeping.done, waiting.result, len(loop.tasks))
+
+
+# A task waiting for an event is cancelled by clear(), a persistent one keeps waiting
+async def listener(name):
+    event = await next_event(name)
+    return event.name
+
+
+app = loop.create_task(listener('app.done'))
+service = loop.create_task(listener('service.done'), persistent=True)
+loop.dispatch()
+print(len(loop.tasks), loop.listener_count)
+loop.clear()
+print(app.done, type(app.error).__name__, len(loop.tasks), loop.listener_count)
+loop.emit(Event('service.done'))
+loop.dispatch()
+print(service.result, len(loop.tasks), loop.active())
+
+
+# Persistent tasks alone don't keep the loop running, they run while the app waits
+service = loop.create_task(listener('service.again'), persistent=True)
+heartbeat = loop.create_task(sleeper('heartbeat', 10000), persistent=True)
+log = []
+run(loop)
+print(log, len(loop.tasks), loop.busy())
+app = loop.create_task(sleeper('app', 5))
+run(loop)
+print(log, len(loop.tasks), loop.busy())
+service.cancel()
+heartbeat.cancel()
+
+
+# Sleeping with the timer queue full raises the IndexError in the task
+async def overslept():
+    try:
+        await sleep_ms(10)
+    except IndexError:
+        return 'IndexError'
+
+
+timers = [loop.call_later(10000, print) for i in range(loop.TIMERS - len(loop.timers))]
+task = loop.create_task(overslept())
+run(loop)
+print(task.result, len(loop.tasks))
+for timer in timers:
+    loop.cancel(timer)
@@ -0,0 +1,78 @@
+# Timers of the event loop and waiting for them
+import stubs
+
+import _thread
+import utime
+from system.events import EventLoop, Timer
+
+loop = EventLoop()
+log = []
+
+
+def run(ms):
+    # Dispatches and waits like keep_listening() for about ms
+    start = utime.ticks_ms()
+    while utime.ticks_diff(utime.ticks_ms(), start) < ms:
+        loop.dispatch()
+        loop.wait()
+
+
+# Timers run in deadline order, a periodic one until it is cancelled
+loop.call_later(30, log.append, 'late')
+loop.call_later(10, log.append, 'early')
+ticks = loop.call_every(15, log.append, 'tick')
+run(50)
+loop.cancel(ticks)
+print(log[:2], log.count('tick') >= 2, log.index('early') < log.index('late'))
+log = []
+run(30)
+print(log, loop.next_timer())
+
+# Rescheduling replaces the earlier deadline
+timer = loop.call_later(10, log.append, 'moved')
+loop.start(timer, 40)
+run(20)
+print(log)
+run(30)
+print(log)
+
+# clear() drops the timers of the app and their queued entries, persistent timers keep running
+log = []
+loop.call_later(10, log.append, 'app')
+loop.call_later(10, log.append, 'kernel', persistent=True)
+stale = loop.call_later(1000, log.append, 'stale')
+loop.start(stale, 2000)
+print(len(loop.timers))
+loop.clear()
+print(len(loop.timers), stale.due)
+run(20)
+print(log, len(loop.timers))
+
+# A full queue makes room by dropping stale entries
+timer = Timer(log.append, ('again',))
+for i in range(EventLoop.TIMERS):
+    loop.start(timer, 1000 + i)
+print(len(loop.timers), loop.start(Timer(log.append, ('new',)), 1000), len(loop.timers))
+loop.purge()
+print(len(loop.timers))
+for i in range(EventLoop.TIMERS - len(loop.timers)):
+    loop.call_later(1000, log.append, 'full')
+try:
+    loop.call_later(10, log.append, 'overflow')
+except IndexError as e:
+    print('IndexError', e)
+loop.clear()
+print(len(loop.timers))
+
+
+# wake() ends a wait before the next timer
+def wake():
+    utime.sleep_ms(20)
+    loop.wake()
+
+
+loop.call_later(500, log.append, 'far')
+_thread.start_new_thread(wake, ())
+start = utime.ticks_ms()
+loop.wait()
+print(utime.ticks_diff(utime.ticks_ms(), start) < 200)
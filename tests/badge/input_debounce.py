@@ -0,0 +1,27 @@
+# Debouncing of the expander pins
+import stubs
+
+import utime
+from machine import I2C, Pin
+from system import I2CBus, Input
+from libs import PCA9555
+
+# A key changing again within its window keeps its state until settle() reads it after the window
+I2C.devices[0x25] = bytearray(b'\xff\xff')
+edges = []
+expander = PCA9555(Input, I2CBus(), 0x25, [Input.KEY_A, Input.KEY_B], Pin(35),
+                   lambda type, code, ticks: edges.append((type, code)), debounce={None: 20, Input.KEY_B: 0})
+expander.init()
+now = utime.ticks_us()
+I2C.devices[0x25][0] = 0x3f
+expander.process(now)
+print(edges, expander.is_pressed(Input.KEY_A), expander.is_pressed(Input.KEY_B))
+# Released 5 ms later: key A bounces, key B has no window
+I2C.devices[0x25][0] = 0xff
+expander.process(utime.ticks_add(now, 5000))
+print(edges, bin(expander.bouncing), utime.ticks_diff(expander.settle_at, now))
+expander.settle()
+print(len(edges), expander.is_pressed(Input.KEY_A))
+utime.sleep_ms(25)
+expander.settle()
+print(edges[-1], expander.bouncing, expander.is_pressed(Input.KEY_A))
@@ -0,0 +1,52 @@
+# Expander interrupts: the ring and reading buttons before the event loop runs
+import stubs
+
+from machine import I2C, Pin
+from system import EventLoop, I2CBus, Input
+from libs import IRQRing
+
+
+class Device:
+    # Records the interrupt times it is processed with
+
+    def __init__(self, ring=None):
+        self.ring = ring
+        self.ticks = []
+
+    def process(self, ticks):
+        self.ticks.append(ticks)
+        if self.ring and len(self.ticks) == 1:
+            # An interrupt while the ring is drained
+            self.ring.push(self)
+
+
+# The ring keeps one slot free and drops interrupts once it is full, the devices get the time of their interrupt
+ring = IRQRing(3)
+woken = []
+ring.wake = lambda: woken.append(1)
+device = Device(ring)
+print([ring.push(device) for i in range(4)], len(woken))
+pushed = ring.ticks[:3]
+print(ring.drain(), device.ticks[:3] == pushed, ring.drain())
+stats = ring.stats()
+print(stats['overflows'], stats['drained'], stats['latency_max'] >= 0)
+print(ring.drain())
+
+
+# A button held at boot is pressed before any event loop drained the interrupts
+class Kernel:
+
+    def __init__(self):
+        self.events = EventLoop()
+        self.i2c = I2CBus()
+
+
+I2C.devices = {0x77: bytearray(2), 0x25: bytearray(b'\xff\xff'), 0x24: bytearray(b'\xff\xff')}
+kernel = Kernel()
+input = Input(kernel)
+keys = []
+kernel.events.on('input', lambda event: keys.append(event.name))
+# START is pin 7 of port 0 of the console expander
+I2C.devices[0x77][0] = 0x80
+input.ioConsole.interrupt.trigger()
+print(input.is_pressed(Input.BTN_START), input.is_pressed(Input.BTN_B), keys)
@@ -0,0 +1,57 @@
+# Matching secret key sequences
+import stubs
+
+from system import SequenceMatcher
+
+KONAMI = 'uuddlrlrba'
+
+matcher = SequenceMatcher()
+matcher.add('konami', KONAMI)
+matcher.add('ab', 'ab')
+matcher.add('ba', 'ba')
+matcher.add('rba', 'rba')
+
+
+def feed(keys):
+    matches = []
+    for i in range(len(keys)):
+        for name in matcher.feed(keys[i]):
+            matches.append((i, name))
+    return sorted(matches)
+
+
+# A repeated first key doesn't lose the progress, overlapping sequences match at the same key
+print(feed('uuu' + KONAMI[2:]))
+print(matcher.progress('konami'), matcher.progress('ab'))
+print(feed('uudd'), matcher.progress('konami'), matcher.progress('rba'))
+print(feed('x'), matcher.progress('konami'))
+print(feed('abab'))
+
+# Replacing and removing sequences rebuilds the automaton
+matcher.add('ab', 'abc')
+matcher.remove('ba')
+matcher.remove('unknown')
+print(feed('abcba'))
+try:
+    matcher.add('empty', '')
+except ValueError as e:
+    print('ValueError', e)
+
+# Same matches as comparing the end of the keys with every sequence
+sequences = {'konami': KONAMI, 'ab': 'ab', 'aab': 'aab', 'bab': 'bab', 'dud': 'dud', 'udud': 'udud'}
+matcher = SequenceMatcher()
+for name in sequences:
+    matcher.add(name, sequences[name])
+seed = 1
+keys = ''
+for i in range(2000):
+    # Linear congruential generator, there is no random module on every port
+    seed = (seed * 1103515245 + 12345) & 0x7fffffff
+    keys += 'udlrab'[(seed >> 16) % 6]
+expected = []
+for i in range(len(keys)):
+    for name in sorted(sequences):
+        if keys[:i + 1].endswith(sequences[name]):
+            expected.append((i, name))
+matches = feed(keys)
+print(len(matches), matches == sorted(expected))
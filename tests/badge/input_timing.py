@@ -0,0 +1,74 @@
+# Long presses, repeats and chords of held keys
+import stubs
+
+import utime
+from machine import I2C
+from system import EventLoop, I2CBus, Input
+
+
+class Kernel:
+
+    def __init__(self):
+        self.events = EventLoop()
+        self.i2c = I2CBus()
+
+
+class FastInput(Input):
+    LONG_PRESS = 60
+    REPEAT_DELAY = 40
+    REPEAT_INTERVAL = 30
+    REPEAT_ACCELERATION = 10
+    REPEAT_MIN = 10
+    CHORD_WINDOW = 20
+
+
+I2C.devices = {0x77: bytearray(2), 0x25: bytearray(b'\xff\xff'), 0x24: bytearray(b'\xff\xff')}
+kernel = Kernel()
+events = kernel.events
+input = FastInput(kernel)
+log = []
+events.on('input', lambda event: log.append((event.name, event.count)))
+
+
+def run(ms):
+    start = utime.ticks_ms()
+    while utime.ticks_diff(utime.ticks_ms(), start) < ms:
+        events.dispatch()
+        events.wait()
+
+
+# A held key emits one long press and repeats with a shrinking interval, its key up counts them
+input.on_input(Input.DOWN, Input.BTN_A)
+run(150)
+input.on_input(Input.UP, Input.BTN_A)
+names = [name for name, count in log]
+repeats = [count for name, count in log if name == 'input.repeat.console.a']
+print(names[0], names.count('input.long.console.a'), names[-1])
+print(len(repeats) >= 4, repeats == list(range(1, len(repeats) + 1)), log[-1][1] == len(repeats))
+# Released keys stop repeating
+log = []
+run(60)
+print(log)
+
+# Keys pressed within the chord window emit a chord and don't repeat, other keys don't
+input.on_input(Input.DOWN, Input.BTN_B)
+input.on_input(Input.DOWN, Input.BTN_A)
+run(100)
+input.on_input(Input.UP, Input.BTN_A)
+input.on_input(Input.UP, Input.BTN_B)
+print([name for name, count in log])
+print(Input.chord_name(Input.BTN_B, Input.BTN_A))
+log = []
+input.on_input(Input.DOWN, Input.BTN_UP)
+run(30)
+input.on_input(Input.DOWN, Input.BTN_DOWN)
+input.on_input(Input.UP, Input.BTN_DOWN)
+input.on_input(Input.UP, Input.BTN_UP)
+print([name for name, count in log if 'chord' in name], input.pressed)
+
+# Released keys are fed to the sequences
+log = []
+for key in Input.CYBAER_CODE:
+    input.on_input(Input.DOWN, key)
+    input.on_input(Input.UP, key)
+print([name for name, count in log if name == 'input.cybaer'], input.sequence_progress('konami'))
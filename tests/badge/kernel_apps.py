@@ -0,0 +1,125 @@
+# Switching apps through the cache of suspended apps
+import stubs
+
+import sys
+from system import Event, EventLoop, Heap, Kernel
+from libs import RefreshPolicy
+
+log = []
+
+
+class Logger:
+
+    def debug(self, *args):
+        pass
+
+    def error(self, *args):
+        print('error:', *args)
+
+    def exception(self, e):
+        print('exception:', e)
+
+
+class Registry:
+
+    def module(self, app):
+        return 'apps.' + app if app == 'main' else 'testapps_' + app
+
+    def compile(self, app):
+        pass
+
+
+class Display:
+
+    lines = 8
+
+    def __init__(self):
+        self.policy = RefreshPolicy()
+
+
+def make_app(name):
+    class App:
+        HEAP_BUDGET = None
+
+        def __init__(self, kernel, screen=0, **kwargs):
+            log.append(('start', name, screen))
+
+        def suspend(self):
+            log.append(('suspend', name))
+
+        def resume(self, screen=0, **kwargs):
+            log.append(('resume', name, screen))
+
+        def exit(self, reason):
+            log.append(('exit', name))
+
+    # Stands in for the module of the app, import finds it in sys.modules
+    class Module:
+        pass
+
+    Module.App = App
+    sys.modules['testapps_' + name] = Module
+
+
+class TestKernel(Kernel):
+
+    def __init__(self):
+        self.logger = Logger()
+        self.registry = Registry()
+        self.display = Display()
+        self.events = EventLoop()
+        self.heap = Heap(self)
+        self.app = None
+        self.task = None
+        self.cache = []
+        self.app_cache_size = 2
+        self.app_cache_watermark = 0
+
+
+for name in ('a', 'b', 'c', 'd'):
+    make_app(name)
+kernel = TestKernel()
+
+
+def switch(app, screen=0):
+    kernel.display.policy.reset()
+    kernel._load(app, screen)
+    print(app, log, [name for name, task in kernel.cache], kernel.display.policy.full)
+    del log[:]
+
+
+# Switched apps are suspended, the least recently used one is exited and unloaded once the cache is full
+switch('a')
+switch('b')
+switch('c')
+switch('a', 1)
+switch('d')
+print('testapps_b' in sys.modules, 'testapps_c' in sys.modules)
+# Loading the current app doesn't switch
+switch('d')
+# Without room in the heap every suspended app is exited
+kernel.app_cache_watermark = 1 << 30
+switch('c')
+
+# The real main menu, its entries survive while it is suspended
+kernel.app_cache_watermark = 0
+main = kernel._load('main')
+print('apps.main' in sys.modules, 'main' in [name for name, task in kernel.cache])
+
+
+def hnzlmnn():
+    # Like Screen.run, which isn't run here
+    screen = main.screens[0]
+    screen.menu = main.menu(screen.MENU_ITEMS)
+    kernel.events.on('input.hnzlmnn', screen.hnzlmnn)
+    kernel.events.result = None
+    kernel.events.emit(Event('input.hnzlmnn'))
+    print(kernel.events.result, [entry['text'] for entry in screen.menu.entries])
+
+
+hnzlmnn()
+make_app('a')
+switch('a')
+print(kernel._load('main') is main)
+# Only added once
+hnzlmnn()
@@ -0,0 +1,53 @@
+# Associating with the configured network again after the settings changed or an association timed out
+import stubs
+
+import network
+import utime
+from system import Kernel
+
+
+class Storage:
+    SSID = 'badge'
+    PSK = 'secret'
+
+
+class Logger:
+
+    def error(self, message):
+        print('error:', message)
+
+
+class Worker:
+
+    def current(self):
+        return True
+
+
+class TestKernel(Kernel):
+
+    def __init__(self):
+        self.storage = Storage()
+        self.logger = Logger()
+        self.worker = Worker()
+        self.wifi_connection = network.WLAN(network.STA_IF)
+        self.wifi_started = None
+        self.wifi_credentials = None
+
+
+kernel = TestKernel()
+connects = network.WLAN.connects
+# An association in progress isn't started again
+print(kernel.wifi_begin(), kernel.wifi_begin(), connects)
+# New settings while associating start over
+kernel.storage.PSK = 'changed'
+print(kernel.wifi_begin(), connects[-1])
+# The association timed out, wifi() waits for a new one instead of giving up at once
+kernel.wifi_started = utime.ticks_add(utime.ticks_ms(), -5000)
+start = utime.ticks_ms()
+print(kernel.wifi(30), len(connects), utime.ticks_diff(utime.ticks_ms(), start) >= 30, kernel.wifi_started)
+# Connected with the configured network
+network.WLAN.connected = True
+print(kernel.wifi(), kernel.wifi_begin(), len(connects))
+# New settings replace the connection
+kernel.storage.SSID = 'other'
+print(kernel.wifi_connected(), kernel.wifi_current(), kernel.wifi_begin(), network.WLAN.connected, connects[-1])
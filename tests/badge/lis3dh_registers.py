@@ -0,0 +1,21 @@
+# Register reads of the accelerometer through the shared buffer
+import stubs
+
+import ustruct
+from machine import I2C
+from system import I2CBus
+from libs import LIS3DH_I2C
+from libs.lis3dh import RANGE_8_G
+
+I2C.devices[0x18] = registers = bytearray(256)
+accel = LIS3DH_I2C(I2CBus())
+accel.range = RANGE_8_G
+print(accel.range == RANGE_8_G, accel.data_rate)
+# Auto-incrementing read of the output registers, 1 g on z
+registers[0xA8:0xAE] = ustruct.pack('<hhh', -2048, 0, 4096)
+print([round(value, 2) for value in accel.acceleration])
+# A read is only valid until the next transfer, callers unpack it right away
+first = accel._read_register(0x20, 1)
+value = first[0]
+accel._read_register(0x23, 1)
+print(value, first[0] == registers[0x23])
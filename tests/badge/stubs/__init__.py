@@ -0,0 +1,13 @@
+# Setup shared by the badge tests, "import stubs" comes first in every test. The stand-ins for the hardware and for
+# the weak links of the esp32 port in this directory shadow the unix modules, the badge modules follow.
+import sys
+
+_stubs = __file__.rsplit('/', 1)[0]
+sys.path[0:0] = [_stubs, _stubs + '/../../../ports/esp32/modules']
+
+# The unix build needs the display module of the badge
+try:
+    import display
+except ImportError:
+    print('SKIP')
+    raise SystemExit
@@ -0,0 +1 @@
+from uio import *
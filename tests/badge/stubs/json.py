@@ -0,0 +1 @@
+from ujson import *
@@ -0,0 +1,105 @@
+# Stand-ins for the badge hardware, tests drive them directly
+
+SOFT_RESET = 4
+SLEEP = 2
+DEEPSLEEP = 4
+
+_rtc_memory = b''
+
+
+class RTC:
+
+    def memory(self, data=None):
+        global _rtc_memory
+        if data is None:
+            return _rtc_memory
+        _rtc_memory = bytes(data)
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+    WAKE_LOW = 4
+
+    def __init__(self, id, *args, **kwargs):
+        self.id = id
+        self.level = 1
+        self.handler = None
+
+    def init(self, *args, **kwargs):
+        pass
+
+    def value(self, level=None):
+        if level is None:
+            return self.level
+        self.level = level
+
+    def irq(self, handler=None, trigger=None, wake=None):
+        # Configuring the wake up keeps the handler
+        if wake is None:
+            self.handler = handler
+
+    def trigger(self):
+        if self.handler:
+            self.handler(self)
+
+
+class I2C:
+    """
+    Devices are bytearrays of registers by address, see I2C.devices
+    """
+    devices = {}
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def scan(self):
+        return list(I2C.devices)
+
+    def readfrom_mem_into(self, address, register, buf):
+        registers = I2C.devices[address]
+        for i in range(len(buf)):
+            buf[i] = registers[register + i]
+
+    def readfrom_mem(self, address, register, count):
+        buf = bytearray(count)
+        self.readfrom_mem_into(address, register, buf)
+        return buf
+
+    def writeto_mem(self, address, register, buf):
+        registers = I2C.devices[address]
+        for i in range(len(buf)):
+            registers[register + i] = buf[i]
+
+
+class SPI:
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def init(self, *args, **kwargs):
+        pass
+
+
+def idle():
+    pass
+
+
+def reset():
+    raise SystemExit
+
+
+def reset_cause():
+    return 0
+
+
+def unique_id():
+    return b'\x00\x01\x02\x03\x04\x05'
+
+
+def deepsleep(ms=0):
+    raise SystemExit
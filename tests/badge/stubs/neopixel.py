@@ -0,0 +1,4 @@
+class NeoPixel:
+
+    def __init__(self, pin, n):
+        self.n = n
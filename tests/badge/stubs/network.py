@@ -0,0 +1,34 @@
+STA_IF = 0
+AP_IF = 1
+
+
+class WLAN:
+    """
+    One interface for all instances like on the badge, tests set WLAN.connected and read WLAN.connects
+    """
+    connected = False
+    # (ssid, psk) of every connect()
+    connects = []
+
+    def __init__(self, interface):
+        self.interface = interface
+
+    def active(self, active=None):
+        if active is None:
+            return WLAN._active
+        WLAN._active = active
+
+    def isconnected(self):
+        return WLAN.connected
+
+    def connect(self, ssid, psk):
+        WLAN.connects.append((ssid, psk))
+
+    def disconnect(self):
+        WLAN.connected = False
+
+    def config(self, name):
+        return b'\x00\x01\x02\x03\x04\x05'
+
+
+WLAN._active = False
@@ -0,0 +1,9 @@
+from uos import *
+def listdir(path='.'):
+    return [e[0] for e in ilistdir(path) if e[0] not in ('.', '..')]
+def rename(a, b):
+    with open(a, 'rb') as f:
+        data = f.read()
+    with open(b, 'wb') as f:
+        f.write(data)
+    remove(a)
@@ -0,0 +1 @@
+from utime import *
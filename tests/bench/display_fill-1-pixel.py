@@ -0,0 +1,14 @@
+# Filling a 99x99 area of the e-paper frame buffer
+# Pixel by pixel, the baseline for the spans
+import bench
+import display
+
+def test(num):
+    d = display.Display(bytearray(128 * 296 // 8), None, 128, 296, font=display.FONT_DEJAVU_12, dump=False)
+    pixel = d.pixel
+    for i in iter(range(num//20000)):
+        for y in range(5, 104):
+            for x in range(3, 102):
+                pixel(x, y, display.BLACK)
+
+bench.run(test)
@@ -0,0 +1,13 @@
+# Filling a 99x99 area of the e-paper frame buffer
+# One span per row, the edge bytes are masked and the bytes between them set at once
+import bench
+import display
+
+def test(num):
+    d = display.Display(bytearray(128 * 296 // 8), None, 128, 296, font=display.FONT_DEJAVU_12, dump=False)
+    hline = d.hline
+    for i in iter(range(num//20000)):
+        for y in range(5, 104):
+            hline(3, y, 99, display.BLACK)
+
+bench.run(test)
@@ -0,0 +1,11 @@
+# Filling a 99x99 area of the e-paper frame buffer
+# A single rectangle, its rows are spans
+import bench
+import display
+
+def test(num):
+    d = display.Display(bytearray(128 * 296 // 8), None, 128, 296, font=display.FONT_DEJAVU_12, dump=False)
+    for i in iter(range(num//20000)):
+        d.fill_rect(3, 5, 102, 104, display.BLACK)
+
+bench.run(test)